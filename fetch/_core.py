@@ -4,43 +4,62 @@ A package for automatically fetching files (eg. Ancillary).
 """
 from __future__ import absolute_import
 
+import copy
 import datetime
-import errno
+import functools
 import logging
 import multiprocessing
 import os
 import re
+import shlex
 import smtplib
-import socket
 import subprocess
-import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.header import Header
 
 from pathlib import Path
 from typing import Callable
 
-from .util import rsync, Uri
+from .util import rsync, Uri, public_fields, get_fqdn
 
 _log = logging.getLogger(__name__)
 
+# Bound once: filename transforms look up the current time for every file.
+_utcnow = datetime.datetime.utcnow
+
+# Upper limit on the number of dates of a DateRangeSource that are fetched at once (when
+# it's configured for parallelism).
+DATE_RANGE_CONCURRENCY = 16
+
+# Directories that fetch_file() has already created or found, so that repeated
+# fetches into the same directory don't check it again.
+_KNOWN_DIRS = set()
+
+# Compile a regexp, reusing an earlier compilation of the same pattern.
+# (Unlike re's own small internal cache, entries are never evicted: a config only has so many patterns,
+# and they're recompiled on every reload otherwise.)
+compile_pattern = functools.lru_cache(maxsize=None)(re.compile)
+
 
 # pylint: disable=eq-without-hash
 class SimpleObject(object):
     """
     An object with matching constructor arguments and properties.
 
-    Implements repr and eq methods that print/compare all properties.
+    Implements repr and eq methods that print/compare all public properties.
+    (Underscore-prefixed properties are derived state, such as caches.)
 
     Beware of cyclic dependencies in properties
     """
 
     def __repr__(self):
-        return '%s(%r)' % (self.__class__.__name__, self.__dict__)
+        return '%s(%r)' % (self.__class__.__name__, public_fields(self))
 
     def __eq__(self, other):
         if isinstance(other, self.__class__):
-            return self.__dict__ == other.__dict__
+            return public_fields(self) == public_fields(other)
         else:
             return False
 
@@ -117,6 +136,34 @@ class ResultHandler(object):
         pass
 
 
+class _SerialisedResultHandler(ResultHandler):
+    """
+    Pass results to another handler one at a time.
+
+    For a handler shared between threads: handlers (and the file processing
+    they may trigger) don't need to be thread-safe themselves.
+    """
+
+    def __init__(self, handler):
+        """
+        :type handler: ResultHandler
+        """
+        self.handler = handler
+        self._lock = threading.Lock()
+
+    def file_error(self, uri, summary, body):
+        with self._lock:
+            self.handler.file_error(uri, summary, body)
+
+    def files_complete(self, source_uri, paths, msg_metadata=None):
+        with self._lock:
+            self.handler.files_complete(source_uri, paths, msg_metadata=msg_metadata)
+
+    def file_complete(self, source_uri, path, msg_metadata=None):
+        with self._lock:
+            self.handler.file_complete(source_uri, path, msg_metadata=msg_metadata)
+
+
 class FilenameTransform(SimpleObject):
     """
     A base class for objects that modify output filenames and directories.
@@ -140,7 +187,7 @@ class FilenameTransform(SimpleObject):
         return output_path
 
     def __repr__(self):
-        return '%s(%r)' % (self.__class__.__name__, self.__dict__)
+        return '%s(%r)' % (self.__class__.__name__, public_fields(self))
 
 
 class RegexpOutputPathTransform(FilenameTransform):
@@ -156,18 +203,32 @@ class RegexpOutputPathTransform(FilenameTransform):
         """
         super(RegexpOutputPathTransform, self).__init__()
 
-        # Validate the pattern immediately on startup.
+        self.pattern = pattern
+        self.last_matched_groups = {}
 
-        # We don't bother keeping the compiled version -- there's no perf. benefit, and
-        # serialisation is more complicated.
+        # Compiling validates the pattern immediately on startup.
         try:
-            re.compile(pattern)
+            self._init_matcher()
         except re.error:
             _log.error('Invalid pattern %r', pattern)
             raise
 
-        self.pattern = pattern
-        self.last_matched_groups = {}
+    def _init_matcher(self):
+        # The compiled version is kept as it's matched against every fetched file.
+        self._re = compile_pattern(self.pattern)
+        # The same filenames are matched repeatedly: once when preparing their directories, then again
+        # when fetching (and on every retry).
+        self._match = functools.lru_cache(maxsize=1024)(self._re.match)
+
+    def __getstate__(self):
+        # The match cache can't be pickled: it's rebuilt from the pattern instead.
+        state = self.__dict__.copy()
+        del state['_re'], state['_match']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_matcher()
 
     def transform_output_path(self, output_path, source_filename):
         """
@@ -182,14 +243,57 @@ class RegexpOutputPathTransform(FilenameTransform):
         >>> t.transform_output_path('/tmp/out', 'LS8_2003')
         '/tmp/out'
         """
-        m = re.match(self.pattern, source_filename)
+        # Nothing to substitute: the (common) static destination needs no match.
+        if '{' not in output_path:
+            return output_path
+
+        m = self._match(source_filename)
 
         if not m:
             _log.info('No regexp match for %r', output_path)
             return output_path
 
-        self.last_matched_groups = m.groupdict()
-        return output_path.format(**self.last_matched_groups)
+        # Format from the local groups: the attribute is shared by every thread using this transform.
+        groups = m.groupdict()
+        self.last_matched_groups = groups
+        return output_path.format(**groups)
+
+
+def _date_fields(day):
+    """
+    Get the fields available to date patterns for the given day.
+
+    The fields are formatted directly from the date's integers, rather than through strftime.
+
+    :type day: datetime.datetime
+    :rtype: dict
+
+    >>> fields = _date_fields(datetime.datetime(2013, 8, 6))
+    >>> [fields[k] for k in ('year', 'month', 'day', 'julday')]
+    ['2013', '08', '06', '218']
+    """
+    return dict(_day_fields(day.year, day.month, day.day), date=day)
+
+
+@functools.lru_cache(maxsize=8)
+def _day_fields(year, month, day):
+    """
+    The date fields that only depend on the day (so are the same for every file fetched that day).
+
+    The returned dict is shared between callers: don't modify it.
+
+    :type year: int
+    :type month: int
+    :type day: int
+    :rtype: dict
+    """
+    return {
+        # Specifics are sometimes clearer. The 'date' field is more flexible.
+        'year': '%04d' % year,
+        'month': '%02d' % month,
+        'day': '%02d' % day,
+        'julday': '%03d' % datetime.date(year, month, day).timetuple().tm_yday,
+    }
 
 
 class DateFilenameTransform(FilenameTransform):
@@ -222,32 +326,178 @@ class DateFilenameTransform(FilenameTransform):
         """
         :type source_filename: str
         """
-        day = self.fixed_date if self.fixed_date else datetime.datetime.utcnow()
-        date_params = {
-            'path': Path(source_filename),
-            'date': day,
-            # Specifics are sometimes clearer. The above are more flexible.
-            'year': day.strftime('%Y'),
-            'month': day.strftime('%m'),
-            'day': day.strftime('%d'),
-            'julday': day.strftime('%j'),
-        }
-        return self.format_.format(
+        format_ = self.format_
+        if format_ == '{filename}':
+            return source_filename
+
+        day = self.fixed_date if self.fixed_date else _utcnow()
+        return format_.format(
             filename=source_filename,
-            **date_params
+            # (Only build the Path if it's used)
+            path=Path(source_filename) if 'path' in format_ else None,
+            date=day,
+            **_day_fields(day.year, day.month, day.day)
         )
 
 
-def mkdirs(target_dir):
+def _ensure_dir(target_dir):
     """
-    Create directory and all parents. Don't complain if exists.
+    Create the directory if needed.
+
+    Each directory is only checked once per process: later calls are a set lookup.
+    :type target_dir: str
     """
-    try:
-        os.makedirs(target_dir)
-    except OSError as e:
-        # be happy if someone already created the path
-        if e.errno != errno.EEXIST:
-            raise
+    if target_dir in _KNOWN_DIRS:
+        return
+
+    # (Concurrent fetches may race to create it: that's fine.)
+    os.makedirs(target_dir, exist_ok=True)
+    _KNOWN_DIRS.add(target_dir)
+
+
+if os.sep == '/':
+    def _join_path(directory, filename):
+        """
+        Join a filename to a directory: os.path.join() for just the common case, without its generality.
+
+        >>> _join_path('/tmp/out', 'a.txt'), _join_path('/tmp/out/', 'a.txt'), _join_path('/tmp/out', 'sub/a.txt')
+        ('/tmp/out/a.txt', '/tmp/out/a.txt', '/tmp/out/sub/a.txt')
+        >>> _join_path('/tmp/out', '/abs/a.txt'), _join_path('', 'a.txt')
+        ('/abs/a.txt', 'a.txt')
+        """
+        if not directory or filename.startswith('/'):
+            return os.path.join(directory, filename)
+        return directory + filename if directory.endswith('/') else directory + '/' + filename
+else:
+    _join_path = os.path.join
+
+
+def _target_path(target_dir, target_filename, filename_transform=None):
+    """
+    Get the destination path of a file, applying any filename transform.
+
+    >>> _target_path('/tmp/out', 'LS8_2003.txt', RegexpOutputPathTransform(r'LS8_(?P<year>\\d{4})'))
+    '/tmp/out/LS8_2003.txt'
+    >>> _target_path('/tmp/out/{year}', 'LS8_2003.txt', RegexpOutputPathTransform(r'LS8_(?P<year>\\d{4})'))
+    '/tmp/out/2003/LS8_2003.txt'
+    """
+    if filename_transform:
+        target_dir = filename_transform.transform_output_path(
+            target_dir,
+            source_filename=target_filename
+        )
+        target_filename = filename_transform.transform_filename(target_filename)
+
+    return _join_path(target_dir, target_filename)
+
+
+def prepare_target_dirs(target_dir, target_filenames, filename_transform=None, override_existing=False,
+                        dir_index=None):
+    """
+    Work out the destinations of a batch of files, creating the directories of those to be fetched up front.
+
+    Sources call this once with everything they're about to fetch, so each distinct
+    directory is created (parents first) in one pass rather than checked per file.
+    Files that already exist (unless overriding them) are skipped, and get no directories.
+
+    :type target_dir: str
+    :type target_filenames: list of str
+    :type filename_transform: FilenameTransform
+    :type override_existing: bool
+    :param dir_index: Optional listing cache to check existing files against
+    :type dir_index: DirectoryIndex
+    :return: The destination path of each file (in the same order), or None for those to skip.
+             (To be passed on to fetch_file(), so the transform isn't applied again.)
+    :rtype: list of str
+    """
+    debug = _log.isEnabledFor(logging.DEBUG)
+    target_paths = []
+    for filename in target_filenames:
+        target_path = _target_path(target_dir, filename, filename_transform)
+        if not override_existing and (dir_index.exists(target_path) if dir_index else os.path.exists(target_path)):
+            if debug:
+                _log.debug('Path exists %r. Skipping', target_path)
+            target_path = None
+        target_paths.append(target_path)
+
+    for d in sorted(set(os.path.dirname(path) for path in target_paths if path)):
+        _ensure_dir(d)
+    return target_paths
+
+
+class DirectoryIndex(object):
+    """
+    A cache of directory listings, for checking which files already exist.
+
+    Listing a directory once is far cheaper than a stat() of every file in a large batch.
+    The index is only valid for the batch it's made for: files added by anything else
+    afterwards aren't seen.
+
+    >>> import tempfile
+    >>> d = tempfile.mkdtemp()
+    >>> open(os.path.join(d, 'a.txt'), 'w').close()
+    >>> index = DirectoryIndex()
+    >>> index.exists(os.path.join(d, 'a.txt')), index.exists(os.path.join(d, 'b.txt'))
+    (True, False)
+    >>> index.add(os.path.join(d, 'b.txt'))
+    >>> index.exists(os.path.join(d, 'b.txt'))
+    True
+    >>> index.exists('/this/does/not/exist.txt')
+    False
+    """
+
+    def __init__(self):
+        # Directory path -> set of entry names
+        self._entries = {}
+
+    def _names(self, directory):
+        names = self._entries.get(directory)
+        if names is None:
+            try:
+                with os.scandir(directory) as it:
+                    names = set(entry.name for entry in it)
+            except FileNotFoundError:
+                names = set()
+            self._entries[directory] = names
+        return names
+
+    def exists(self, path):
+        """
+        :type path: str
+        :rtype: bool
+        """
+        directory, name = os.path.split(path)
+        return name in self._names(directory)
+
+    def add(self, path):
+        """
+        Record a file that has been created.
+        :type path: str
+        """
+        directory, name = os.path.split(path)
+        self._names(directory).add(name)
+
+
+def _create_temp_file(directory, prefix):
+    """
+    Create a new, uniquely-named empty file in the directory.
+
+    It's created atomically, so concurrent fetches can never pick the same name. Unlike with
+    tempfile.mkstemp() (which uses 0600), it gets the usual permissions of the current umask:
+    fetched files must stay readable by everyone else using the archive.
+
+    :type directory: str
+    :type prefix: str
+    :return: The path of the file
+    :rtype: str
+    """
+    while True:
+        path = os.path.join(directory, prefix + os.urandom(6).hex())
+        try:
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+        except FileExistsError:
+            continue
+        return path
 
 
 def fetch_file(uri: str,
@@ -256,7 +506,10 @@ def fetch_file(uri: str,
                target_filename: str,
                target_dir: str,
                filename_transform: FilenameTransform = None,
-               override_existing: bool = False) -> bool:
+               override_existing: bool = False,
+               dir_index: DirectoryIndex = None,
+               resumable: bool = False,
+               target_path: str = None) -> bool:
     """
     Common code for fetching a file.
 
@@ -270,62 +523,75 @@ def fetch_file(uri: str,
     :param target_dir: The destination directory
     :param filename_transform: A transform for output filenames/folders.
     :param override_existing: Should files be re-downloaded if they already exist?
+    :param dir_index: Optional listing cache to check existing files against (for batches of files)
+    :param resumable: Download to a fixed partial-file path, kept after a failed fetch, so that the
+                      fetch function can resume a later attempt from what it already has.
+    :param target_path: The destination path, if already worked out (see prepare_target_dirs())
     :return True on success
     """
-    if filename_transform:
-        target_dir = filename_transform.transform_output_path(
-            target_dir,
-            source_filename=target_filename
-        )
-        target_filename = filename_transform.transform_filename(target_filename)
-
-    target_path = os.path.join(target_dir, target_filename)
-
-    if os.path.exists(target_path) and not override_existing:
-        _log.debug('Path exists %r. Skipping', target_path)
+    # Checked once: this is called for every file of a (possibly large) listing.
+    debug = _log.isEnabledFor(logging.DEBUG)
+    if target_path is None:
+        target_path = _target_path(target_dir, target_filename, filename_transform)
+
+    if not override_existing and (dir_index.exists(target_path) if dir_index else os.path.exists(target_path)):
+        if debug:
+            _log.debug('Path exists %r. Skipping', target_path)
         return True
 
     # Create directories if needed.
     # (We can't use 'target_dir', because the 'filename' can contain folder offsets too.)
     actual_target_dir = os.path.dirname(target_path)
-    if not os.path.exists(actual_target_dir):
-        _log.info('Creating dir %r', actual_target_dir)
-        mkdirs(actual_target_dir)
+    _ensure_dir(actual_target_dir)
 
     t = None
     try:
-        t = tempfile.mktemp(
-            dir=target_dir,
-            prefix='.fetch-'
-        )
+        if resumable:
+            # (Runs of a rule never overlap, so the name only needs to be unique per file.)
+            t = os.path.join(actual_target_dir, '.fetch-{}.part'.format(os.path.basename(target_path)))
+        else:
+            t = _create_temp_file(actual_target_dir, prefix='.fetch-')
 
-        _log.debug('Running fetch for file %r', uri)
+        if debug:
+            _log.debug('Running fetch for file %r', uri)
         was_success = fetch_fn(t)
         if not was_success:
             _log.debug("Download function reported error.")
             return False
 
-        if not os.path.exists(t):
+        # (One stat for both checks)
+        try:
+            size_bytes = os.stat(t).st_size
+        except FileNotFoundError:
             _log.debug('No file returned for %r', uri)
             reporter.file_error(uri, "No file", "")
             return False
 
-        size_bytes = os.path.getsize(t)
         if size_bytes == 0:
             _log.debug('Empty file returned for %r', uri)
             reporter.file_error(uri, "Empty file", "")
             return False
 
-        _log.debug('Fetch complete')
-
         # Move to destination
-        _log.debug('Rename %r -> %r', t, target_path)
-        os.rename(t, target_path)
+        if debug:
+            _log.debug('Fetch complete. Rename %r -> %r', t, target_path)
+        os.replace(t, target_path)
+        # Nothing left to clean up.
+        t = None
+        if dir_index:
+            dir_index.add(target_path)
         # Report as complete.
         reporter.file_complete(uri, target_path)
     finally:
-        if t and os.path.exists(t):
-            os.remove(t)
+        if t:
+            try:
+                if resumable and os.path.getsize(t):
+                    _log.debug('Keeping partial download %r', t)
+                else:
+                    os.remove(t)
+            except FileNotFoundError:
+                # The fetch function may have removed (or never written) it.
+                pass
 
     return True
 
@@ -336,20 +602,19 @@ def _date_range(from_days_from_now, to_days_from_now):
 
     :type from_days_from_now: int
     :type to_days_from_now: int
-    :rtype: list od datetime.datetime
+    :rtype: list of datetime.datetime
 
-    >>> len(list(_date_range(-1, 1)))
+    >>> len(_date_range(-1, 1))
     3
-    >>> len(list(_date_range(0, 1)))
+    >>> len(_date_range(0, 1))
     2
-    >>> len(list(_date_range(-2, 0)))
+    >>> len(_date_range(-2, 0))
     3
     """
-    start_day = datetime.datetime.utcnow() + datetime.timedelta(days=from_days_from_now)
+    start_day = _utcnow() + datetime.timedelta(days=from_days_from_now)
     days = to_days_from_now - from_days_from_now
 
-    for day in (start_day + datetime.timedelta(days=n) for n in range(days + 1)):
-        yield day
+    return [start_day + datetime.timedelta(days=n) for n in range(days + 1)]
 
 
 class RsyncMirrorSource(DataSource):
@@ -360,7 +625,7 @@ class RsyncMirrorSource(DataSource):
     (ie. public key pairs are configured).
     """
 
-    def __init__(self, source_path, target_path, source_host=None, target_host=None):
+    def __init__(self, source_path, target_path, source_host=None, target_host=None, multiplex_ssh=False):
         """
         Hostnames are optional, defaulting to the current machine.
 
@@ -368,12 +633,16 @@ class RsyncMirrorSource(DataSource):
         :type target_path: str
         :type source_host: str or None
         :type target_host: str on None
+        :param multiplex_ssh: Keep SSH connections open briefly, to be reused by the next transfers to the same
+                              host (eg. the other dates of a DateRangeSource). The socket is kept in ~/.ssh.
+        :type multiplex_ssh: bool
         """
         super(RsyncMirrorSource, self).__init__()
         self.source_host = source_host
         self.target_host = target_host
         self.source_path = source_path
         self.target_path = target_path
+        self.multiplex_ssh = multiplex_ssh
 
     def trigger(self, reporter):
         """
@@ -383,7 +652,8 @@ class RsyncMirrorSource(DataSource):
             self.source_path,
             self.target_path,
             source_host=self.source_host,
-            destination_host=self.target_host
+            destination_host=self.target_host,
+            multiplex_ssh=self.multiplex_ssh
         )
         _log.debug('Transferred: %r', transferred_files)
         reporter.files_complete(
@@ -409,12 +679,15 @@ class DateRangeSource(DataSource):
     Repeat a source multiple times with different dates.
     """
 
-    def __init__(self, using, overridden_properties, start_day=-1, end_day=1):
+    def __init__(self, using, overridden_properties, start_day=-1, end_day=1, parallelism=None):
         """
         :type using: DataSource
         :type overridden_properties: dict of (str, str)
         :type start_day: int
         :type end_day: int
+        :param parallelism: Maximum number of dates to fetch at once (at most DATE_RANGE_CONCURRENCY).
+                            By default they're fetched one after another.
+        :type parallelism: int
         """
         super(DateRangeSource, self).__init__()
         self.overridden_properties = overridden_properties
@@ -424,29 +697,62 @@ class DateRangeSource(DataSource):
 
         self.start_day = start_day
         self.end_day = end_day
+        self.parallelism = parallelism
 
     def trigger(self, reporter):
         """
         Run the DataSource prototype once for each date in the range.
+
+        The dates are fetched in order, or concurrently if a parallelism is set. Each date
+        gets its own copy of the prototype, so the overridden properties of one date never
+        leak into another. Concurrent results are passed to the reporter one at a time.
         :type reporter: ResultHandler
         """
-        for day in _date_range(self.start_day, self.end_day):
-            date_params = {
-                'year': day.strftime('%Y'),
-                'month': day.strftime('%m'),
-                'day': day.strftime('%d'),
-                'julday': day.strftime('%j'),
-                # More flexible: can use any date formats.
-                'date': day
-            }
-
-            for name, pattern in self.overridden_properties.items():
-                value = pattern.format(**date_params)
-                _log.debug('Setting %r=%r', name, value)
-                setattr(self.using, name, value)
+        # Bind each property's formatter once, rather than once per date.
+        formatters = [(name, pattern.format) for name, pattern in self.overridden_properties.items()]
+        sources = [self._source_for_day(day, formatters) for day in _date_range(self.start_day, self.end_day)]
+        if not sources:
+            return
+
+        parallelism = min(len(sources), self.parallelism or 1, DATE_RANGE_CONCURRENCY)
+        if parallelism <= 1:
+            for source in sources:
+                _log.info('Triggering %r', source)
+                source.trigger(reporter)
+            return
+
+        reporter = _SerialisedResultHandler(reporter)
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+            futures = []
+            for source in sources:
+                _log.info('Triggering %r', source)
+                futures.append(executor.submit(source.trigger, reporter))
 
-            _log.info('Triggering %r', self.using)
-            self.using.trigger(reporter)
+        # Re-raise any failure, as a sequential run would have.
+        for future in futures:
+            future.result()
+
+    def _source_for_day(self, day, formatters):
+        """
+        Create a copy of the prototype with properties set for the given day.
+        :type day: datetime.datetime
+        :param formatters: (property name, format function) pairs
+        :rtype: DataSource
+        """
+        date_params = _date_fields(day)
+
+        debug = _log.isEnabledFor(logging.DEBUG)
+
+        source = copy.copy(self.using)
+        # The filename transform is the one stateful member: don't share it between concurrent dates.
+        if getattr(source, 'filename_transform', None) is not None:
+            source.filename_transform = copy.copy(source.filename_transform)
+        for name, format_ in formatters:
+            value = format_(**date_params)
+            if debug:
+                _log.debug('Setting %r=%r', name, value)
+            setattr(source, name, value)
+        return source
 
 
 class TaskFailureListener(object):
@@ -467,6 +773,12 @@ class TaskFailureListener(object):
         """
         pass
 
+    def close(self):
+        """
+        Release anything held open between notifications (Eg. connections), when the listener is done with.
+        """
+        pass
+
 
 class TaskFailureEmailer(TaskFailureListener):
     """
@@ -479,6 +791,10 @@ class TaskFailureEmailer(TaskFailureListener):
         """
         self.addresses = addresses
 
+        # An open SMTP connection, reused for later mails from the same process.
+        self._smtp = None
+        self._smtp_pid = None
+
     def on_file_failure(self, process_name, file_uri, summary, body_text):
         """
         Send mail on a
@@ -517,7 +833,7 @@ class TaskFailureEmailer(TaskFailureListener):
         :type body_text: str
         :type process_name: str
         """
-        hostname = socket.getfqdn()
+        hostname = get_fqdn()
         msg = MIMEText(body_text.encode('utf-8'), 'plain', 'utf-8')
         msg['Subject'] = Header(u'{name} failure on {hostname}'.format(
             name=process_name,
@@ -529,13 +845,47 @@ class TaskFailureEmailer(TaskFailureListener):
         )
         msg['from'] = from_address
         msg['to'] = ", ".join(self.addresses)
-        s = smtplib.SMTP('localhost')
-        s.sendmail(
+        self._smtp_connection().sendmail(
             from_address,
             self.addresses,
             msg.as_string()
         )
-        s.quit()
+
+    def _smtp_connection(self):
+        """
+        Get an open SMTP connection, reusing the last one if it's still alive.
+
+        :rtype: smtplib.SMTP
+        """
+        # Never reuse a connection opened by the parent of a forked process: they'd both be talking on it.
+        pid = os.getpid()
+        if self._smtp is not None and self._smtp_pid == pid:
+            try:
+                self._smtp.noop()
+                return self._smtp
+            except (smtplib.SMTPException, OSError):
+                _log.debug('SMTP connection closed. Reconnecting.')
+                self._smtp.close()
+
+        self._smtp = smtplib.SMTP('localhost')
+        self._smtp_pid = pid
+        return self._smtp
+
+    def close(self):
+        """
+        Politely end any open SMTP connection.
+        """
+        if self._smtp is None:
+            return
+        try:
+            # (A forked child's copy just has its socket closed: the parent is still using the connection)
+            if self._smtp_pid == os.getpid():
+                self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        finally:
+            self._smtp.close()
+            self._smtp = None
 
 
 class FileProcessor(SimpleObject):
@@ -553,6 +903,37 @@ class FileProcessor(SimpleObject):
         raise NotImplementedError('process() was not implemented')
 
 
+# Shell syntax (other than quoting) that needs a real shell to interpret it.
+_SHELL_SYNTAX_RE = re.compile(r'[|&;<>()$`\\*?\[\]~#\n]|^\s*\w+=')
+# Our own {format} fields, which are substituted before the shell sees them.
+_FORMAT_FIELD_RE = re.compile(r'{[^{}]*}')
+
+
+@functools.lru_cache(maxsize=None)
+def _split_command(command):
+    """
+    Split a command (template) into its arguments, if it can be run without a shell.
+
+    :type command: str
+    :return: The arguments, or None if the command needs a shell.
+    :rtype: tuple of str
+
+    >>> _split_command('gdal_translate -a_srs "+proj=latlong +datum=WGS84" {parent_dirs[0]}/{filename}')
+    ('gdal_translate', '-a_srs', '+proj=latlong +datum=WGS84', '{parent_dirs[0]}/{filename}')
+    >>> _split_command('gunzip -c {filename} > {file_stem}') is None
+    True
+    >>> _split_command('echo "unbalanced {filename}') is None
+    True
+    """
+    if _SHELL_SYNTAX_RE.search(_FORMAT_FIELD_RE.sub('', command)):
+        return None
+    try:
+        return tuple(shlex.split(command))
+    except ValueError:
+        # Eg. unbalanced quotes: leave it to the shell, which reports it as a failed command.
+        return None
+
+
 class ShellFileProcessor(FileProcessor):
     """
     A file processor that executes a (patterned) shell command.
@@ -566,6 +947,9 @@ class ShellFileProcessor(FileProcessor):
         self.expect_file = expect_file
         self.input_files = input_files
 
+        # Compiled once (and validated on startup): it's matched against every processed file.
+        self._input_files_re = compile_pattern(input_files[0]) if input_files else None
+
     def _apply_file_pattern(self, pattern, file_path, **keywords):
         """
         Format the given pattern.
@@ -585,8 +969,17 @@ class ShellFileProcessor(FileProcessor):
         >>> p._apply_file_pattern('{base}.hdf', '/tmp/something.hdf',**{'base':'/tmp/something'})
         '/tmp/something.hdf'
         """
+        return pattern.format(**self._file_fields(file_path), **keywords)
+
+    @staticmethod
+    def _file_fields(file_path):
+        """
+        The fields available to patterns for the given file.
+        :type file_path: str
+        :rtype: dict
+        """
         path = Path(file_path)
-        return pattern.format(
+        return dict(
             # Full filename
             filename=path.name,
             # Suffix of filename (with dot: '.txt')
@@ -599,7 +992,6 @@ class ShellFileProcessor(FileProcessor):
 
             # A more flexible alternative to the above.
             path=path,
-            **keywords
         )
 
     def process(self, file_path):
@@ -610,29 +1002,43 @@ class ShellFileProcessor(FileProcessor):
         """
         command = self.command
         if self.input_files:
-            path_transform = RegexpOutputPathTransform(self.input_files[0])
-            if not all([os.path.isfile(path_transform.transform_output_path(f, file_path))
-                        for f in self.input_files[1]]):
+            m = self._input_files_re.match(file_path)
+            # format the required paths (and later the command) based on the groups matched
+            required_files_formating = m.groupdict() if m else {}
+            if not all(os.path.isfile(f.format(**required_files_formating) if m else f)
+                       for f in self.input_files[1]):
                 _log.info('Not all of the required_files are present.')
                 # This is used for reporting, so it is returning the file_path.
                 return file_path
-            else:
-                # format the path based on the group from
-                # transform output path
-                # command = path_transform.transform_output_path(command)
-                required_files_formating = path_transform.last_matched_groups
         else:
             required_files_formating = {}
-        command = self._apply_file_pattern(command, file_path, **required_files_formating)
-        _log.info('Running %r', command)
 
-        # Trigger command
-        returned = subprocess.call(command, shell=True)
+        # Every pattern (each command argument and the expected file) is formatted with the same fields.
+        fields = self._file_fields(file_path)
+        fields.update(required_files_formating)
+
+        # Simple commands are run directly, saving a shell process per file. (Each argument
+        # is formatted separately, so paths containing spaces or quotes stay a single argument.)
+        args = _split_command(command)
+        if args is None:
+            command = command.format(**fields)
+            _log.info('Running %r', command)
+            returned = subprocess.call(command, shell=True)
+        else:
+            args = [arg.format(**fields) for arg in args]
+            command = ' '.join(shlex.quote(arg) for arg in args)
+            _log.info('Running %r', command)
+            try:
+                returned = subprocess.call(args)
+            except OSError as e:
+                # (eg. command not found: a shell would have returned an error code)
+                raise FileProcessError('Cannot run command %r: %s' % (command, e)) from e
+
         if returned != 0:
             raise FileProcessError('Return code %r from command %r' % (returned, command))
 
         # Check that output exists
-        expected_path = self._apply_file_pattern(self.expect_file, file_path, **required_files_formating)
+        expected_path = self.expect_file.format(**fields)
 
         if not os.path.exists(expected_path):
             raise FileProcessError('Expected output not found {!r} for command {!r}'.format(expected_path, command))
@@ -11,9 +11,11 @@ from __future__ import print_function, absolute_import
 
 import fcntl
 import heapq
+import itertools
 import logging
 import multiprocessing
 import os
+import selectors
 import signal
 # This pylint warning is wrong: stat still exists?
 # pylint: disable=bad-python3-import
@@ -21,16 +23,28 @@ import stat
 import sys
 import time
 
-import arrow
-from croniter import croniter
 
 from . import load
-from ._core import ResultHandler, TaskFailureEmailer, RemoteFetchException, mkdirs
+from ._core import ResultHandler, TaskFailureEmailer, RemoteFetchException
 
 # setproctitle is only supported on some platforms (Linux).
 try:
     from setproctitle import setproctitle
 except ImportError:
+    setproctitle = None
+
+if setproctitle is None and sys.platform.startswith('linux'):
+    # Without setproctitle we can still set the (15 char) thread name shown by top/htop.
+    import ctypes
+    import ctypes.util
+
+    _PR_SET_NAME = 15
+    _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+
+    def setproctitle(title):
+        _libc.prctl(_PR_SET_NAME, title.encode('utf-8')[:15], 0, 0, 0)
+
+if setproctitle is None:
     # On non-support platforms we won't bother setting the process name.
     def setproctitle(title):
         return None
@@ -38,27 +52,52 @@ except ImportError:
 _log = logging.getLogger(__name__)
 
 
+class _Humanized(object):
+    """
+    A time that's printed in human terms ("in 5 minutes"), for log messages.
+
+    It's only formatted (and arrow only imported) if a log message is actually emitted.
+    """
+
+    def __init__(self, timestamp):
+        self.timestamp = timestamp
+
+    def __str__(self):
+        import arrow
+        return arrow.get(self.timestamp).humanize()
+
+
 def _attempt_lock(lock_file):
     """
     Use the given file as a lock.
 
-    Return true if successful.
+    Return the lock's file descriptor if successful (the lock is held while it's open), or None.
 
     :type lock_file: str
-    :rtype: bool
+    :rtype: int
     """
     umask_original = os.umask(0)
     try:
-        fp = os.open(lock_file, os.O_WRONLY | os.O_CREAT, stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+        fp = os.open(
+            lock_file,
+            os.O_WRONLY | os.O_CREAT | os.O_CLOEXEC,
+            stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH | stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+        )
     finally:
         os.umask(umask_original)
 
+    # A whole-file lock, held (by leaving fp open) until our process exits.
     try:
-        fcntl.lockf(fp, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        fcntl.flock(fp, fcntl.LOCK_EX | fcntl.LOCK_NB)
     except IOError:
-        return False
+        os.close(fp)
+        return None
 
-    return True
+    # Record the holder, for anyone wondering why a rule is being skipped.
+    os.ftruncate(fp, 0)
+    os.write(fp, ('%d\n' % os.getpid()).encode('ascii'))
+
+    return fp
 
 
 def _redirect_output(log_file):
@@ -67,7 +106,19 @@ def _redirect_output(log_file):
 
     :type log_file: str
     """
-    output = open(log_file, 'w')
+    # Anything already buffered belongs to the old destination.
+    for stream in (sys.stdout, sys.stderr):
+        if stream:
+            stream.flush()
+
+    # Redirect the file descriptors themselves, so any commands we run (rsync, processing
+    # commands...) write to the log too, not just our own Python code.
+    fd = os.open(log_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    os.dup2(fd, 1)
+    os.dup2(fd, 2)
+    os.close(fd)
+
+    output = open(2, 'w', closefd=False)
     sys.stdout = output
     sys.stderr = output
     logging_clear()
@@ -87,13 +138,17 @@ def _run_item(reporter, item, scheduled_time, log_directory, lock_directory):
         reporter, item, scheduled_time, log_directory, lock_directory
     )
 
-    _log.debug('Module info %r', item.module)
     _log.info('Starting %r. Log %r, Lock %r', p.name, p.log_file, p.lock_file)
     p.start()
     return p
 
 
-class ScheduledProcess(multiprocessing.Process):
+# Children are forked from the already-initialised scheduler, so starting one costs no
+# interpreter start-up or re-import (unlike the 'spawn'/'forkserver' methods some Pythons default to).
+_PROCESS_CONTEXT = multiprocessing.get_context('fork')
+
+
+class ScheduledProcess(_PROCESS_CONTEXT.Process):
     """
     A subprocess to run a module.
     """
@@ -134,23 +189,31 @@ class ScheduledProcess(multiprocessing.Process):
         self.lock_file = lock_file
         self.name = 'fetch-{}-{}'.format(scheduled_time_st, id_)
         self.scheduled_time = scheduled_time
-        self.module = item.module
         self.reporter = reporter
         self.item = item
+        # When the run will be stopped if it's still going (if the item has a timeout).
+        self.deadline = time.time() + item.timeout if item.timeout else None
+        # Runs that may time out lead their own process group, so that everything they start can be stopped.
+        self.own_process_group = bool(item.timeout)
 
     def run(self):
         """
         Configure the environment and run our module.
         """
+        if self.own_process_group:
+            # So that a timeout stops any commands we start too (see _terminate_overdue_children()).
+            # A terminal's Ctrl-C no longer reaches us: the parent passes it on (see _forward_signal()).
+            os.setpgrp()
         _init_signals()
+        _reset_wakeup_fd()
         _redirect_output(self.log_file)
 
-        if not _attempt_lock(self.lock_file):
+        if _attempt_lock(self.lock_file) is None:
             _log.debug('Lock is activated. Skipping run. %r', self.name)
             sys.exit(0)
 
         setproctitle(self.name)
-        _log.debug('Triggering %s: %r', self.name, self.module)
+        _log.debug('Triggering %s: %r', self.name, self.item.module)
         try:
 
             class WrapHandler(ResultHandler):
@@ -171,6 +234,8 @@ class ScheduledProcess(multiprocessing.Process):
                     self.item = item
                     self.reporter = reporter
                     self.scheduled_time = scheduled_time
+                    # The same for every file of the run.
+                    self.trigger_time_st = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(scheduled_time))
 
                 def file_complete(self, source_uri, path, msg_metadata=None):
                     """
@@ -186,14 +251,14 @@ class ScheduledProcess(multiprocessing.Process):
                     md.update({
                         'fetch-cron-pattern': self.item.cron_pattern,
                         'fetch-trigger-name': self.item.name,
-                        'fetch-trigger-time': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(self.scheduled_time)),
+                        'fetch-trigger-time': self.trigger_time_st,
                     })
 
                     self.reporter.file_complete(source_uri, path, msg_metadata=md)
 
             # TODO: Create processing pool?
             # Use for post processing (and/or multiple concurrent downloads?)
-            self.module.trigger(WrapHandler(self.item, self.scheduled_time, self.reporter))
+            self.item.module.trigger(WrapHandler(self.item, self.scheduled_time, self.reporter))
             _log.debug('Module completed.')
 
         except RemoteFetchException as e:
@@ -219,6 +284,65 @@ def _init_signals(trigger_exit=None, trigger_reload=None):
     signal.signal(signal.SIGHUP, trigger_reload if trigger_reload else signal.SIG_DFL)
 
 
+def _init_wakeup_fd():
+    """
+    Make signals wake up a waiting main loop.
+
+    Python writes to a pipe on every signal, so waiting on its read end
+    returns as soon as one arrives.
+
+    :return: A selector that becomes ready when a signal arrives.
+    :rtype: selectors.BaseSelector
+    """
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(read_fd, False)
+    os.set_blocking(write_fd, False)
+    signal.set_wakeup_fd(write_fd)
+
+    selector = selectors.DefaultSelector()
+    selector.register(read_fd, selectors.EVENT_READ)
+    return selector
+
+
+def _reset_wakeup_fd():
+    """
+    Undo _init_wakeup_fd() (within a child process).
+    """
+    signal.set_wakeup_fd(-1)
+
+
+def _wait(o, seconds):
+    """
+    Sleep for the given time, or until a signal arrives or a watched child exits.
+
+    Children are watched by registering their sentinel with the wakeup selector,
+    with the process as its data.
+
+    :type o: RunConfig
+    :param seconds: Maximum time to wait. None to wait indefinitely (requires a wakeup selector).
+    :type seconds: float
+    :return: The watched children that have exited.
+    :rtype: list of ScheduledProcess
+    """
+    if o.wakeup is None:
+        time.sleep(seconds)
+        return []
+
+    exited_children = []
+    for key, _ in o.wakeup.select(timeout=seconds):
+        if key.data is None:
+            # Signal pipe: drain it, so the next wait will block.
+            try:
+                while os.read(key.fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+        else:
+            o.wakeup.unregister(key.fd)
+            exited_children.append(key.data)
+    return exited_children
+
+
 def _on_child_finish(child, notifiers):
     """
     Handle child process cleanup: Check for errors.
@@ -263,6 +387,56 @@ def _filter_finished_children(running_children, notifiers):
     return still_running
 
 
+def _terminate_overdue_children(running_children, now):
+    """
+    Stop any children that have run past their deadline.
+
+    They're reported as failed once they exit, like any other failed run.
+
+    :type running_children: set of ScheduledProcess
+    :type now: float
+    """
+    for child in running_children:
+        if child.deadline is not None and child.deadline < now:
+            _log.warning('Child %s %s exceeded its timeout of %ss. Terminating.',
+                         child.name, child.pid, child.item.timeout)
+            # Its whole process group: a fetch or processing command it started (rsync, a shell
+            # command...) would otherwise keep running, and keep writing, after it.
+            try:
+                os.killpg(child.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                # It hasn't created its group yet.
+                child.terminate()
+            # Only once.
+            child.deadline = None
+
+
+def _forward_signal(running_children, signal_):
+    """
+    Send a signal to the children that lead their own process group (and so don't share ours).
+
+    :type running_children: set of ScheduledProcess
+    :type signal_: int
+    """
+    for child in list(running_children):
+        if child.own_process_group:
+            try:
+                os.killpg(child.pid, signal_)
+            except ProcessLookupError:
+                # Not yet in its own group (so it shares ours), or already gone.
+                pass
+
+
+def _next_deadline(running_children):
+    """
+    The earliest deadline of the given children, or None if none have one.
+
+    :type running_children: set of ScheduledProcess
+    :rtype: float
+    """
+    return min((child.deadline for child in running_children if child.deadline is not None), default=None)
+
+
 def get_day_log_dir(log_directory, time_secs):
     """
     Get log directory for this day.
@@ -274,15 +448,13 @@ def get_day_log_dir(log_directory, time_secs):
     '/tmp/day-dir-test/2014/11-18'
     """
     # We use localtime because the cron scheduling uses localtime.
-    t = time.localtime(time_secs)
-
     day_log_dir = os.path.join(
         log_directory,
-        time.strftime('%Y', t),
-        time.strftime('%m-%d', t)
+        time.strftime('%Y/%m-%d', time.localtime(time_secs))
     )
-    if not os.path.exists(day_log_dir):
-        mkdirs(day_log_dir)
+    # Not cached (unlike fetch target directories): the daemon runs indefinitely, gaining a directory
+    # a day, and old ones may be cleaned away while it runs.
+    os.makedirs(day_log_dir, exist_ok=True)
 
     return day_log_dir
 
@@ -292,12 +464,18 @@ def _on_shutdown(running_children, notifiers):
     :type running_children: set of ScheduledProcess
     """
     # Shut down -- Join all children.
-    all_children = running_children.union(multiprocessing.active_children())
-    _log.info('Waiting on %r children', len(all_children))
-    for p in all_children:
+    # (every child we start is tracked in running_children)
+    _log.info('Waiting on %r children', len(running_children))
+    for p in running_children:
+        if p.deadline is not None:
+            p.join(max(p.deadline - time.time(), 0))
+            _terminate_overdue_children([p], time.time())
         p.join()
         _on_child_finish(p, notifiers)
 
+    for notifier in notifiers:
+        notifier.close()
+
 
 class Schedule(object):
     """
@@ -306,28 +484,59 @@ class Schedule(object):
     Keeps items ordered by date so the next item can be easily retrieved.
     """
 
-    def __init__(self, items):
+    def __init__(self, items, previous=None):
         """
         :type items: list[ScheduledItem]
+        :param previous: An earlier schedule (before a config reload). Items that are unchanged
+                         since then keep their existing trigger time.
+        :type previous: Schedule
         """
-        self.schedule = []
         now = time.time()
-        for scheduled_item in items:
-            self.add_item(scheduled_item, base_date=now)
+        # : :type: dict of (str, (float, ScheduledItem))
+        previous_entries = dict((item.name, (t, item)) for t, item in previous.entries()) if previous else {}
+
+        # A heap of (trigger time, id) pairs: ties on the trigger time are broken by the
+        # (int) id, so the items themselves are never compared.
+        self.schedule = []
+        # : :type: dict of (int, ScheduledItem)
+        self._items = {}
+        self._ids = itertools.count()
+        for item in items:
+            previous_entry = previous_entries.get(item.name)
+            if previous_entry and previous_entry[1] == item:
+                trigger_time = previous_entry[0]
+                item = previous_entry[1]
+            else:
+                trigger_time = self._next_trigger(item, now)
+            self.schedule.append(self._add_entry(trigger_time, item))
+        # Build the whole heap at once rather than pushing each item.
+        heapq.heapify(self.schedule)
+
+    def __len__(self):
+        return len(self.schedule)
+
+    def entries(self):
+        """
+        All scheduled items (in no particular order).
+        :rtype: list of (float, ScheduledItem)
+        """
+        return [(trigger_time, self._items[id_]) for trigger_time, id_ in self.schedule]
 
     def peek_next(self):
         """
         See the next scheduled item without removing it.
         :rtype: (float, ScheduledItem)
         """
-        return self.schedule[0]
+        trigger_time, id_ = self.schedule[0]
+        return trigger_time, self._items[id_]
 
     def pop_next(self):
         """
         Remove the next scheduled item.
         :rtype: (float, ScheduledItem)
         """
-        return heapq.heappop(self.schedule)
+        trigger_time, id_ = heapq.heappop(self.schedule)
+        return trigger_time, self._items.pop(id_)
 
     def add_item(self, item, base_date=None):
         """
@@ -339,10 +548,78 @@ class Schedule(object):
         if base_date is None:
             base_date = time.time()
 
-        next_trigger = croniter(item.cron_pattern, start_time=base_date).get_next()
+        next_trigger = self._next_trigger(item, base_date)
+        heapq.heappush(self.schedule, self._add_entry(next_trigger, item))
+        return next_trigger
+
+    def pop_due(self, now):
+        """
+        Remove all items scheduled before the given time.
+        :type now: float
+        :rtype: list of (float, ScheduledItem)
+        """
+        due = []
+        while self.schedule and self.schedule[0][0] < now:
+            due.append(self.pop_next())
+        return due
+
+    def reschedule_due(self, now):
+        """
+        Get all items scheduled before the given time, scheduling their next runs after it.
+        :type now: float
+        :return: The due items, with the time they were scheduled for.
+        :rtype: list of (float, ScheduledItem)
+        """
+        if not self.schedule or self.schedule[0][0] >= now:
+            return []
+
+        # Usually a single item is due: replace it with its next run in one heap operation.
+        trigger_time, id_ = self.schedule[0]
+        item = self._items[id_]
+        # Add the next run before forgetting this one, so the schedule is never missing the item.
+        heapq.heapreplace(self.schedule, self._add_entry(self._next_trigger(item, now), item))
+        del self._items[id_]
+
+        others = self.pop_due(now)
+        if others:
+            self.add_items([other_item for _, other_item in others], base_date=now)
+        return [(trigger_time, item)] + others
+
+    def add_items(self, items, base_date):
+        """
+        Add several items to the schedule at once.
+        :type items: list of ScheduledItem
+        :type base_date: float
+        """
+        if len(items) == 1:
+            self.add_item(items[0], base_date=base_date)
+            return
+
+        self.schedule.extend(self._add_entry(self._next_trigger(item, base_date), item) for item in items)
+        heapq.heapify(self.schedule)
+
+    def _add_entry(self, trigger_time, item):
+        """
+        Record the item, returning its heap entry (which the caller must add to the heap).
+        :type trigger_time: float
+        :type item: ScheduledItem
+        :rtype: (float, int)
+        """
+        id_ = next(self._ids)
+        self._items[id_] = item
+        return trigger_time, id_
 
-        _log.debug('Scheduled action %r %s', item.name, arrow.get(next_trigger).humanize())
-        heapq.heappush(self.schedule, (next_trigger, item))
+    @staticmethod
+    def _next_trigger(item, base_date):
+        """
+        Get the next time the item should run after the base date.
+        :type item: ScheduledItem
+        :type base_date: float
+        :rtype: float
+        """
+        next_trigger = item.next_trigger(base_date)
+
+        _log.debug('Scheduled action %r %s', item.name, _Humanized(next_trigger))
         return next_trigger
 
 
@@ -353,8 +630,15 @@ class RunConfig(object):
 
     def __init__(self, config_path):
         self.config_path = config_path
+        # The (mtime, size) of the config file when it was last loaded.
+        self.config_version = None
 
         self.are_exiting = False
+        # Our running children. (Kept here for the exit signal handler.)
+        #: :type: set of ScheduledProcess
+        self.running_children = set()
+        # Set by SIGHUP: the loop reloads the config at its next pass.
+        self.reload_requested = False
         # : :type: Schedule
         self.schedule = None
         # : type: str
@@ -370,19 +654,38 @@ class RunConfig(object):
         # Key-values are log names and levels.
         #: :type: dict of (str, str)
         self.log_levels = None
+        # Becomes ready when a signal arrives or a child exits (see _init_wakeup_fd())
+        #: :type: selectors.BaseSelector
+        self.wakeup = None
 
     def load(self):
         """
         Reload configuration
+
+        Nothing is reloaded if the file is unchanged since last time.
         """
+        try:
+            st = os.stat(self.config_path)
+            config_version = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            # Let the loading report it.
+            config_version = None
+
+        if config_version and config_version == self.config_version:
+            _log.info('Config unchanged: not reloading')
+            return
+
         config = load.load_yaml(self.config_path)
 
-        self.schedule = Schedule(config.rules)
+        self.schedule = Schedule(config.rules, previous=self.schedule)
         self.base_directory = config.directory
         self.messaging_settings = config.messaging_settings
 
         _log.info('%s messaging configuration.', 'Loaded' if config.messaging_settings else 'No')
 
+        # (The old ones may be holding connections open)
+        for notifier in self.notifiers:
+            notifier.close()
         self.notifiers = []
         if config.notify_addresses:
             self.notifiers.append(TaskFailureEmailer(config.notify_addresses))
@@ -395,18 +698,18 @@ class RunConfig(object):
         if not self.lock_directory:
             self.lock_directory = os.path.join(self.base_directory, 'lock')
             _log.info('Using lock directory %s', self.lock_directory)
-            if not os.path.exists(self.lock_directory):
-                mkdirs(self.lock_directory)
+            os.makedirs(self.lock_directory, exist_ok=True)
 
         self.log_directory = os.path.join(self.base_directory, 'log')
         _log.info('Using log directory %s', self.log_directory)
-        if not os.path.exists(self.log_directory):
-            mkdirs(self.log_directory)
+        os.makedirs(self.log_directory, exist_ok=True)
 
         if config.log_levels != self.log_levels:
             _set_logging_levels(config.log_levels)
             self.log_levels = config.log_levels
 
+        self.config_version = config_version
+
 
 class NotifyResultHandler(ResultHandler):
     """
@@ -429,13 +732,13 @@ class NotifyResultHandler(ResultHandler):
         :type source_uri: str
         :type paths: list of str
         """
-        md = msg_metadata or {}
-        md.update({
-            'source-uri': source_uri
-        })
-
         _log.info('Completed %r -> %r', source_uri, paths)
         if self.config.messaging_settings:
+            md = msg_metadata or {}
+            md.update({
+                'source-uri': source_uri
+            })
+
             # Optional library.
             #: pylint: disable=import-error
             from neocommon import message, Uri as NeoUri
@@ -511,61 +814,80 @@ def run_loop(o):
 
     # Keep track of running children to view their exit codes later.
     # : :type: set of ScheduledProcessor
-    running_children = set()
+    running_children = o.running_children
+    # : :type: list of ScheduledProcessor
+    exited_children = []
 
     while not o.are_exiting:
-        running_children = _filter_finished_children(running_children, o.notifiers)
+        if o.reload_requested:
+            # Reloaded here rather than in the signal handler, which could interrupt the loop mid-update.
+            o.reload_requested = False
+            _log.info('Reloading configuration')
+            o.load()
+            _log.debug('%s rules loaded', len(o.schedule))
+
+        if o.wakeup is None:
+            # We're not told when children exit, so check them all.
+            running_children.intersection_update(_filter_finished_children(running_children, o.notifiers))
+        elif exited_children:
+            # Only the children we were woken for.
+            running_children.difference_update(exited_children)
+            for child in exited_children:
+                # Their sentinel closes as they exit, so this is (at most) a brief wait to reap them.
+                child.join()
+                _on_child_finish(child, o.notifiers)
+            exited_children = []
+            _log.debug('%r running children', len(running_children))
 
-        # active_children() also cleans up zombie subprocesses.
-        child_count = len(multiprocessing.active_children())
+        now = time.time()
+        _terminate_overdue_children(running_children, now)
 
-        _log.debug('%r recorded children, %r total children', len(running_children), child_count)
+        # Pick the first from the sorted list (ie. the closest to now)
+        if o.schedule and o.schedule.peek_next()[0] < now:
+            # Trigger time has passed, so let's run it (and anything else that's due).
+            # (They're rescheduled straight away, so a reload while we start them keeps their next runs.)
+            due = o.schedule.reschedule_due(now)
+
+            for scheduled_time, scheduled_item in due:
+                reporter = NotifyResultHandler(o, scheduled_item.sanitized_name)
+
+                p = _run_item(
+                    reporter,
+                    scheduled_item,
+                    scheduled_time=scheduled_time,
+                    # Use a unique log directory for each day
+                    log_directory=get_day_log_dir(o.log_directory, scheduled_time),
+                    lock_directory=o.lock_directory
+                )
+                running_children.add(p)
+                if o.wakeup:
+                    # Wake up when it exits.
+                    o.wakeup.register(p.sentinel, selectors.EVENT_READ, p)
+                _log.debug('Created child %s for %r', p.pid, scheduled_item.name)
 
+        # Sleep until next action is ready (or something else happens).
         if not o.schedule:
             _log.info('No scheduled items. Sleeping.')
-            time.sleep(500)
-            continue
-
-        now = time.time()
-        # Pick the first from the sorted list (ie. the closest to now)
-        scheduled_time, scheduled_item = o.schedule.peek_next()
-
-        if scheduled_time < now:
-            # Trigger time has passed, so let's run it.
-
-            scheduled_time, scheduled_item = o.schedule.pop_next()
-
-            reporter = NotifyResultHandler(o, scheduled_item.sanitized_name)
-
-            p = _run_item(
-                reporter,
-                scheduled_item,
-                scheduled_time=scheduled_time,
-                # Use a unique log directory for each day
-                log_directory=get_day_log_dir(o.log_directory, scheduled_time),
-                lock_directory=o.lock_directory
-            )
-            running_children.add(p)
-
-            # Schedule next run for this module
-            next_trigger = o.schedule.add_item(scheduled_item, base_date=now)
-
-            _log.debug(
-                'Created child %s. Next %r trigger %s',
-                p.pid,
-                scheduled_item.name,
-                arrow.get(next_trigger).humanize()
-            )
+            # Nothing to do until a signal (eg. a reload) or child exit wakes us.
+            # (without the wakeup fd we have to poll for the shutdown/reload flags)
+            sleep_seconds = None if o.wakeup else 500
         else:
-            # Sleep until next action is ready.
-            sleep_seconds = (scheduled_time - now) + 0.1
+            scheduled_time, scheduled_item = o.schedule.peek_next()
+            sleep_seconds = max(scheduled_time - time.time(), 0) + 0.1
             _log.debug(
                 'Next action %s: %r (sleeping %.2f)',
-                arrow.get(scheduled_time).humanize(),
+                _Humanized(scheduled_time),
                 scheduled_item.name,
                 sleep_seconds
             )
-            time.sleep(sleep_seconds)
+
+        deadline = _next_deadline(running_children)
+        if deadline is not None:
+            # Wake in time to stop an overdue run.
+            until_deadline = max(deadline - time.time(), 0) + 0.1
+            sleep_seconds = until_deadline if sleep_seconds is None else min(sleep_seconds, until_deadline)
+
+        exited_children = _wait(o, sleep_seconds)
     _log.info('Shutting down.')
     _on_shutdown(running_children, o.notifiers)
 
@@ -580,7 +902,7 @@ def run_items(o, *item_names):
     """
     _log.info('Triggering items %r', item_names)
     # Find all chosen items.
-    chosen_items = [item for scheduled_time, item in o.schedule.schedule if item.name in item_names]
+    chosen_items = [item for scheduled_time, item in o.schedule.entries() if item.name in item_names]
     if len(chosen_items) < len(item_names):
         found_names = set([item.name for item in chosen_items])
         missing_names = set(item_names) - found_names
@@ -588,22 +910,23 @@ def run_items(o, *item_names):
             'No rule exists with name(s): {missing_names}\n'
             '\nPossible Values:\n\t{possible_names}').format(
             missing_names=", ".join(map(repr, missing_names)),
-            possible_names="\n\t".join([repr(item.name) for _, item in o.schedule.schedule])
+            possible_names="\n\t".join([repr(item.name) for _, item in o.schedule.entries()])
         ))
 
     # Scheduled now.
     scheduled_time = time.time()
+    # Use a unique log directory for each day
+    log_directory = get_day_log_dir(o.log_directory, scheduled_time)
 
-    # Trigger them all.
+    # Trigger them all: each runs concurrently in its own process.
     # : :type: set of ScheduledProcessor
-    running_children = set()
+    running_children = o.running_children
     for chosen_item in chosen_items:
         p = _run_item(
             NotifyResultHandler(o, chosen_item.sanitized_name),
             chosen_item,
             scheduled_time=scheduled_time,
-            # Use a unique log directory for each day
-            log_directory=get_day_log_dir(o.log_directory, scheduled_time),
+            log_directory=log_directory,
             lock_directory=o.lock_directory
         )
         running_children.add(p)
@@ -631,14 +954,15 @@ def init_run_config(config_path):
     def trigger_exit(signal_, frame_):
         """Start a graceful shutdown"""
         o.are_exiting = True
+        # Runs in their own process group don't get a terminal's Ctrl-C like the others: pass it on.
+        _forward_signal(o.running_children, signal_)
 
     def trigger_reload(signal_, frame_):
-        """Handle signal to reload config"""
-        _log.info('Reloading configuration')
-        o.load()
-        _log.debug('%s rules loaded', len(o.schedule.schedule))
+        """Handle signal to reload config (at the next pass of the run loop)"""
+        o.reload_requested = True
 
     _init_signals(trigger_exit=trigger_exit, trigger_reload=trigger_reload)
+    o.wakeup = _init_wakeup_fd()
 
     return o
 
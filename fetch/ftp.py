@@ -6,11 +6,10 @@ from __future__ import absolute_import
 import ftplib
 import logging
 import os
-import re
 import time
 from typing import Iterable, Callable
 
-from ._core import DataSource, fetch_file, RemoteFetchException, ResultHandler
+from ._core import DataSource, compile_pattern, fetch_file, prepare_target_dirs, RemoteFetchException, ResultHandler
 
 _log = logging.getLogger(__name__)
 DEFAULT_SOCKET_TIMEOUT_SECS = 60 * 5.0
@@ -44,8 +43,17 @@ def _fetch_files(hostname: str,
     try:
         ftp.login()
 
-        files_itr = iter(get_filepaths_fn(ftp))
-        filename = next(files_itr)
+        filepaths = list(get_filepaths_fn(ftp))
+        target_paths = prepare_target_dirs(
+            target_dir,
+            [os.path.basename(filepath) for filepath in filepaths],
+            filename_transform=filename_transform,
+            override_existing=override_existing
+        )
+
+        # (Those that already exist are skipped)
+        files_itr = ((f, path) for f, path in zip(filepaths, target_paths) if path)
+        filename, target_path = next(files_itr)
         retry_count = 0
 
         while True:
@@ -69,9 +77,10 @@ def _fetch_files(hostname: str,
                     os.path.basename(filename),
                     target_dir,
                     filename_transform=filename_transform,
-                    override_existing=override_existing
+                    override_existing=override_existing,
+                    target_path=target_path
                 )
-                filename = next(files_itr)
+                filename, target_path = next(files_itr)
                 retry_count = 0
 
             except (EOFError, ftplib.error_temp):
@@ -192,9 +201,10 @@ class FtpListingSource(DataSource):
                     raise
 
             _log.debug('File list of length %r', len(files))
+            name_match = compile_pattern(self.name_pattern).match
             files = [
                 os.path.join(self.source_dir, f)
-                for f in files if re.match(self.name_pattern, os.path.basename(f))
+                for f in files if name_match(os.path.basename(f))
             ]
             _log.debug('Filtered list of length %r', len(files))
             return files
@@ -4,9 +4,11 @@ HTTP-based download of files.
 from __future__ import absolute_import
 
 import logging
-import re
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import closing
+from email.utils import parsedate_to_datetime
 from typing import Tuple, Sequence
 from urllib.parse import urljoin
 
@@ -14,12 +16,27 @@ import feedparser
 import requests
 from lxml import etree
 from requests import Session
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 
-from ._core import SimpleObject, DataSource, fetch_file, RemoteFetchException, ResultHandler, FilenameTransform
+from ._core import (SimpleObject, DataSource, fetch_file, prepare_target_dirs, RemoteFetchException, ResultHandler,
+                    FilenameTransform, DirectoryIndex, DATE_RANGE_CONCURRENCY, compile_pattern, _target_path)
 
 DEFAULT_CONNECT_TIMEOUT_SECS = 100
 
+# Bytes to read from the network at a time when downloading.
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Extended attribute recording the ETag a file was downloaded with (used by skip_unchanged).
+ETAG_XATTR = 'user.fetch.etag'
+
+# Files smaller than this are always fetched over a single connection.
+MIN_RANGED_DOWNLOAD_SIZE = 8 * 1024 * 1024
+
+# Keep-alive connections to retain per host.
+# (Enough for every date of a DateRangeSource to hold one at once.)
+DEFAULT_POOL_SIZE = DATE_RANGE_CONCURRENCY
+
 _log = logging.getLogger(__name__)
 
 
@@ -165,6 +182,19 @@ class _HttpBaseSource(DataSource):
         self.retry_count = retry_count
         self.retry_delay_seconds = retry_delay_seconds
 
+        # Keep-alive connection pool, shared by every session of this source and of its
+        # copies (such as each date of a DateRangeSource) so warm connections are reused.
+        self._adapter = HTTPAdapter(pool_maxsize=DEFAULT_POOL_SIZE)
+
+    def _new_session(self) -> Session:
+        """
+        Create a session that draws connections from this source's pool.
+        """
+        session = SessionWithRedirection()
+        session.mount('http://', self._adapter)
+        session.mount('https://', self._adapter)
+        return session
+
     def _get_all_urls(self) -> Sequence[URL]:
         """
         """
@@ -187,7 +217,7 @@ class _HttpBaseSource(DataSource):
         if not all_urls:
             raise RuntimeError("HTTP type requires either 'url' or 'urls'.")
 
-        session = SessionWithRedirection()
+        session = self._new_session()
 
         if self.beforehand:
             _log.debug('Triggering %r', self.beforehand)
@@ -209,29 +239,89 @@ class _HttpBaseSource(DataSource):
                      urls_filenames: Sequence[Tuple[URL, str]],
                      reporter: ResultHandler,
                      session: Session = requests,
-                     override_existing=False):
+                     override_existing=False,
+                     resumable=False,
+                     connections=1,
+                     record_etag=False):
         """
         Utility method for fetching HTTP URL to the target folder.
+
+        :param resumable: Resume from any partial download left by an earlier failed attempt.
+        :param connections: Fetch large files in this many parts at once, if the server supports ranges.
+        :param record_etag: Record each file's ETag with it (see _is_unchanged())
         """
 
         def do_fetch(t: str):
             """Fetch data to file path t"""
+            resume_from = 0
+            if resumable:
+                try:
+                    resume_from = os.path.getsize(t)
+                except FileNotFoundError:
+                    pass
+
+            if connections > 1 and not resume_from:
+                ranged = _ranged_download_info(session, url, self.connection_timeout)
+                if ranged:
+                    size, etag = ranged
+                    try:
+                        error = _fetch_ranges(session, url, t, size, connections, self.connection_timeout)
+                    except _RangesUnsupported:
+                        # Fall through to fetching it in one request.
+                        _log.debug('Server did not return ranges of %r. Fetching it whole.', url)
+                    else:
+                        if error:
+                            reporter.file_error(url, *error)
+                            return False
+                        if record_etag:
+                            _record_etag(t, etag)
+                        return True
+
+            headers = {'Range': 'bytes=%d-' % resume_from} if resume_from else None
+            res = session.get(url, stream=True, timeout=self.connection_timeout, headers=headers)
+            if resume_from and res.status_code == 416:
+                # The partial file doesn't fit the remote one (it may have changed): start again.
+                _log.debug('Cannot resume %r from %r. Restarting.', url, resume_from)
+                res.close()
+                os.remove(t)
+                return do_fetch(t)
 
-            res = session.get(url, stream=True, timeout=self.connection_timeout)
             if not res.ok:
                 body = res.text
                 _log.debug('Received text %r', res.text)
                 reporter.file_error(url, "Status code %r" % res.status_code, body)
                 return False
 
-            with open(t, 'wb') as f:
-                for chunk in res.iter_content(4096):
+            # Only append if the server sent just the requested range. (Otherwise it's the whole file.)
+            append = resume_from and res.status_code == 206
+            if append:
+                _log.debug('Resuming %r from byte %r', url, resume_from)
+
+            # Let the file's buffer batch the writes: flushing every chunk cost a write syscall per chunk.
+            with open(t, 'ab' if append else 'wb') as f:
+                for chunk in res.iter_content(DOWNLOAD_CHUNK_SIZE):
                     if chunk:
                         f.write(chunk)
-                        f.flush()
+            if record_etag:
+                # (On the temp file: it's kept through the rename)
+                _record_etag(t, res.headers.get('ETag'))
             return True
 
-        for url, target_name in urls_filenames:
+        # Check for existing files against one listing per directory, rather than a stat per file.
+        dir_index = None if override_existing else DirectoryIndex()
+        target_paths = prepare_target_dirs(
+            self.target_dir,
+            [target_name for _, target_name in urls_filenames],
+            filename_transform=self.filename_transform,
+            override_existing=override_existing,
+            dir_index=dir_index
+        )
+
+        for (url, target_name), target_path in zip(urls_filenames, target_paths):
+            if target_path is None:
+                # Already exists.
+                continue
+
             attempt_count = 0
             while True:
                 did_succeed = fetch_file(
@@ -241,7 +331,10 @@ class _HttpBaseSource(DataSource):
                     target_name,
                     self.target_dir,
                     filename_transform=self.filename_transform,
-                    override_existing=override_existing
+                    override_existing=override_existing,
+                    dir_index=dir_index,
+                    resumable=resumable,
+                    target_path=target_path
                 )
                 if did_succeed or attempt_count > self.retry_count:
                     break
@@ -259,6 +352,30 @@ class HttpSource(_HttpBaseSource):
     repeatedly updated.
     """
 
+    def __init__(self,
+                 target_dir,
+                 url=None,
+                 urls=None,
+                 filename_transform=None,
+                 beforehand=None,
+                 connection_timeout=DEFAULT_CONNECT_TIMEOUT_SECS,
+                 retry_count: int = 3,
+                 retry_delay_seconds: float = 5.0,
+                 skip_unchanged: bool = False,
+                 connections: int = 1):
+        super(HttpSource, self).__init__(target_dir,
+                                         url=url,
+                                         urls=urls,
+                                         filename_transform=filename_transform,
+                                         beforehand=beforehand,
+                                         connection_timeout=connection_timeout,
+                                         retry_count=retry_count,
+                                         retry_delay_seconds=retry_delay_seconds)
+        # Check (with a HEAD request) whether the remote file has changed before re-downloading it.
+        self.skip_unchanged = skip_unchanged
+        # Fetch large files in this many parts at once (with range requests) to speed up slow/rate-limited servers.
+        self.connections = connections
+
     def trigger_url(self, reporter, session, url):
         """
         Download URL, overriding existing.
@@ -267,7 +384,142 @@ class HttpSource(_HttpBaseSource):
         :type url: str
         """
         name = filename_from_url(url)
-        self._fetch_files([(url, name)], reporter, session=session, override_existing=True)
+        if self.skip_unchanged:
+            target_path = _target_path(self.target_dir, name, self.filename_transform)
+            if _is_unchanged(session, url, target_path, self.connection_timeout):
+                _log.debug('Unchanged %r. Skipping', url)
+                return
+        self._fetch_files([(url, name)], reporter, session=session, override_existing=True,
+                          connections=self.connections, record_etag=self.skip_unchanged)
+
+
+def _record_etag(path: str, etag: str):
+    """
+    Record the ETag of a downloaded file as an extended attribute of it.
+    """
+    if not etag:
+        return
+    try:
+        os.setxattr(path, ETAG_XATTR, etag.encode('utf-8'))
+    except (AttributeError, OSError):
+        # Unsupported by the platform or filesystem: we'll compare sizes and times instead.
+        _log.debug('Cannot record ETag of %r', path)
+
+
+def _recorded_etag(path: str) -> str:
+    """
+    Get the ETag recorded for a downloaded file, if any.
+    """
+    try:
+        return os.getxattr(path, ETAG_XATTR).decode('utf-8')
+    except (AttributeError, OSError):
+        return None
+
+
+def _ranged_download_info(session: Session, url: URL, timeout: float) -> Tuple[int, str]:
+    """
+    Get the size and ETag of the remote file, if it's worth fetching in parts (and the server supports that).
+
+    :return: The size in bytes and the ETag (if any), or None to fetch it in one request.
+    """
+    res = session.head(url, allow_redirects=True, timeout=timeout)
+    if not res.ok or res.headers.get('Accept-Ranges') != 'bytes':
+        return None
+
+    content_length = res.headers.get('Content-Length')
+    if content_length is None or int(content_length) < MIN_RANGED_DOWNLOAD_SIZE:
+        return None
+    return int(content_length), res.headers.get('ETag')
+
+
+class _RangesUnsupported(Exception):
+    """
+    The server answered a range request with something other than the range.
+    """
+
+
+def _fetch_ranges(session: Session, url: URL, path: str, size: int, connections: int, timeout: float):
+    """
+    Fetch the URL to the given path as several concurrent range requests, each writing its own part of the file.
+
+    The file is removed on failure: it would otherwise have holes.
+
+    :return: The (summary, body) of any failure, or None on success.
+    :raises _RangesUnsupported: if the server didn't return a requested range, so the file should be fetched whole.
+    """
+    # Inclusive byte ranges.
+    ranges = [(size * i // connections, size * (i + 1) // connections - 1) for i in range(connections)]
+
+    def fetch_range(start, end):
+        res = session.get(url, stream=True, timeout=timeout, headers={'Range': 'bytes=%d-%d' % (start, end)})
+        if res.status_code != 206:
+            # Probably the whole file (or an error page), which we don't want to read here: a single
+            # request will fetch it, or report the error.
+            res.close()
+            raise _RangesUnsupported(res.status_code)
+
+        offset = start
+        for chunk in res.iter_content(DOWNLOAD_CHUNK_SIZE):
+            # (pwrite: no shared file position between the threads)
+            offset += os.pwrite(fd, chunk, offset)
+        if offset != end + 1:
+            return "Incomplete range", 'Received bytes {}-{} of {}-{}'.format(start, offset - 1, start, end)
+        return None
+
+    _log.debug('Fetching %r in %r parts', url, connections)
+    succeeded = False
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        # Allocate it all upfront, so the parts aren't written to a fragmented, growing file.
+        os.posix_fallocate(fd, 0, size)
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            errors = [e for e in executor.map(lambda r: fetch_range(*r), ranges) if e]
+        succeeded = not errors
+    finally:
+        os.close(fd)
+        if not succeeded:
+            os.remove(path)
+
+    return errors[0] if errors else None
+
+
+def _is_unchanged(session: Session, url: URL, target_path: str, timeout: float) -> bool:
+    """
+    Is the local copy of the URL up-to-date?
+
+    If both the server and the local copy have an ETag, it is when they match.
+    Otherwise it is if the server reports the same length as the local file,
+    and a modification time no later than it.
+    """
+    try:
+        st = os.stat(target_path)
+    except FileNotFoundError:
+        return False
+
+    res = session.head(url, allow_redirects=True, timeout=timeout)
+    if not res.ok:
+        return False
+
+    etag = res.headers.get('ETag')
+    if etag:
+        recorded_etag = _recorded_etag(target_path)
+        if recorded_etag is not None:
+            return recorded_etag == etag
+
+    content_length = res.headers.get('Content-Length')
+    if content_length is not None and int(content_length) != st.st_size:
+        return False
+
+    last_modified = res.headers.get('Last-Modified')
+    if not last_modified:
+        return False
+    try:
+        remote_mtime = parsedate_to_datetime(last_modified).timestamp()
+    except (TypeError, ValueError):
+        _log.debug('Unparseable Last-Modified %r for %r', last_modified, url)
+        return False
+
+    return remote_mtime <= st.st_mtime
 
 
 class HttpListingSource(_HttpBaseSource):
@@ -286,7 +538,9 @@ class HttpListingSource(_HttpBaseSource):
                  beforehand=None,
                  connection_timeout=DEFAULT_CONNECT_TIMEOUT_SECS,
                  retry_count: int = 3,
-                 retry_delay_seconds: float = 5.0):
+                 retry_delay_seconds: float = 5.0,
+                 resume_partial: bool = False,
+                 connections: int = 1):
         super(HttpListingSource, self).__init__(target_dir,
                                                 url=url,
                                                 urls=urls,
@@ -296,6 +550,12 @@ class HttpListingSource(_HttpBaseSource):
                                                 retry_count=retry_count,
                                                 retry_delay_seconds=retry_delay_seconds)
         self.name_pattern = name_pattern
+        # Keep partial downloads after a failure, and resume them (with a Range request) on the next attempt.
+        # (Listed files are assumed not to change once published: a partial file is only resumed when
+        # the server honours the range.)
+        self.resume_partial = resume_partial
+        # Fetch large files in this many parts at once (with range requests) to speed up slow/rate-limited servers.
+        self.connections = connections
 
     def trigger_url(self, reporter, session, url):
         """
@@ -326,6 +586,7 @@ class HttpListingSource(_HttpBaseSource):
         anchors = page.xpath('//a')
 
         # Build a list of URLs to fetch
+        name_match = compile_pattern(self.name_pattern).match
         urls_names = []
         for anchor in anchors:
             # : :type: str
@@ -345,7 +606,7 @@ class HttpListingSource(_HttpBaseSource):
                 _log.debug('Not a filename %r, skipping.', name)
                 continue
 
-            if not re.match(self.name_pattern, name):
+            if not name_match(name):
                 _log.debug("Filename (%r) doesn't match pattern, skipping.", name)
                 continue
             urls_names.append((source_url, name))
@@ -353,8 +614,10 @@ class HttpListingSource(_HttpBaseSource):
         self._fetch_files(
             urls_names,
             reporter,
-            session=session
+            session=session,
             # ,override_existing=True
+            resumable=self.resume_partial,
+            connections=self.connections
         )
 
 
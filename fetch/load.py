@@ -8,6 +8,7 @@ import functools
 import inspect
 import logging
 import os
+import re
 
 import yaml
 import yaml.resolver
@@ -16,7 +17,7 @@ from croniter import croniter
 from . import ftp, http, ecmwf
 from ._core import (RegexpOutputPathTransform, DateRangeSource, DateFilenameTransform, RsyncMirrorSource, SimpleObject,
                     ShellFileProcessor)
-from .util import remove_nones
+from .util import remove_nones, public_fields
 
 _log = logging.getLogger(__name__)
 
@@ -43,7 +44,11 @@ def _sanitize_for_filename(text):
     >>> _sanitize_for_filename('LS8 BPF')
     'ls8-bpf'
     """
-    return "".join([x if x.isalnum() else "-" for x in text.lower()])
+    return _NON_ALNUM_RE.sub('-', text.lower())
+
+
+# Anything other than a letter or digit. (a "word" character minus underscore)
+_NON_ALNUM_RE = re.compile(r'[\W_]')
 
 
 class ScheduledItem(SimpleObject):
@@ -53,9 +58,10 @@ class ScheduledItem(SimpleObject):
     :type cron_pattern: str
     :type module: fetch.DataSource
     :type process: fetch.FileProcessor
+    :type timeout: float
     """
 
-    def __init__(self, name, cron_pattern, module, process=None):
+    def __init__(self, name, cron_pattern, module, process=None, timeout=None):
         super(ScheduledItem, self).__init__()
         self.name = name
         if not name:
@@ -68,21 +74,46 @@ class ScheduledItem(SimpleObject):
         # Optional file processor.
         self.process = process
 
+        # Optional maximum run time (seconds) before the run is stopped.
+        # (validated now: a bad value would otherwise only fail, or stop every run at once, when the item runs)
+        if timeout is not None:
+            try:
+                if isinstance(timeout, bool):
+                    raise TypeError(timeout)
+                timeout = float(timeout)
+            except (TypeError, ValueError):
+                raise ValueError('Timeout of item %r is not a number of seconds: %r' % (name, timeout))
+            if not timeout > 0:
+                raise ValueError('Timeout of item %r must be positive: %r' % (name, timeout))
+        self.timeout = timeout
+
         self.cron_pattern = cron_pattern
         if not cron_pattern:
             raise ValueError('No cron schedule provided for item %r' % (name,))
 
+        # Used for the log, lock and process names of every run.
+        self._sanitized_name = _sanitize_for_filename(name)
+
         # Validate cron expression immediately.
+        # (the parsed version is kept, to calculate each of the item's trigger times)
         try:
-            croniter(cron_pattern)
+            self._cron = croniter(cron_pattern)
         except ValueError as v:
             raise ValueError('Cron parse error on {!r}: {!r}'.format(name, cron_pattern), v)
 
+        # Every-minute rules are common: their trigger times don't need croniter.
+        self._every_minute = cron_pattern.split() == ['*'] * 5
+        self._last_trigger = self._cron.cur
+
+    def _sort_key(self):
+        # The last calculated trigger time (see next_trigger()), then name.
+        return self._last_trigger, self.name
+
     def __gt__(self, other):
-        return (croniter(self.cron_pattern).cur, self.name) > (croniter(other.cron_pattern).cur, other.name)
+        return self._sort_key() > other._sort_key()
 
     def __lt__(self, other):
-        return (croniter(self.cron_pattern).cur, self.name) < (croniter(other.cron_pattern).cur, other.name)
+        return self._sort_key() < other._sort_key()
 
     def __le__(self, other):
         return (self == other) or self < other
@@ -90,13 +121,33 @@ class ScheduledItem(SimpleObject):
     def __ge__(self, other):
         return (self == other) or self > other
 
+    def next_trigger(self, base_date):
+        """
+        Get the next time this item should run after the given time.
+        :type base_date: float
+        :rtype: float
+
+        >>> from ._core import EmptySource
+        >>> ScheduledItem('every minute', '* * * * *', EmptySource()).next_trigger(1416285412.5)
+        1416285420.0
+        >>> ScheduledItem('hourly', '0 * * * *', EmptySource()).next_trigger(1416285412.5)
+        1416286800.0
+        """
+        if self._every_minute:
+            # The start of the next minute.
+            self._last_trigger = float((int(base_date) // 60 + 1) * 60)
+        else:
+            self._cron.set_current(base_date, force=True)
+            self._last_trigger = self._cron.get_next()
+        return self._last_trigger
+
     @property
     def sanitized_name(self):
         """
         The name with whitespace and special chars stripped out.
         :rtype: str
         """
-        return _sanitize_for_filename(self.name)
+        return self._sanitized_name
 
 
 def load_yaml(file_path):
@@ -184,7 +235,7 @@ class Config(object):
         if 'rules' in config:
             for name, fields in config['rules'].items():
                 item = ScheduledItem(name, fields.get('schedule'), fields.get('source'),
-                                     process=fields.get('process'))
+                                     process=fields.get('process'), timeout=fields.get('timeout'))
                 rules.append(item)
 
         return Config(
@@ -212,7 +263,8 @@ class Config(object):
                     r.name, remove_nones({
                         'schedule': r.cron_pattern,
                         'source': r.module,
-                        'process': r.process
+                        'process': r.process,
+                        'timeout': r.timeout
                     })
                 )
                 for r in self.rules
@@ -316,7 +368,7 @@ def _init_yaml_handling():
 
     def _yaml_default_representer(tag, flow_style, dumper, data):
         """
-        Represent the (__dict__) fields of an object as a YAML map.
+        Represent the public (__dict__) fields of an object as a YAML map.
 
         Null fields are ignored.
 
@@ -326,7 +378,7 @@ def _init_yaml_handling():
         """
         return dumper.represent_mapping(
             tag,
-            remove_nones(data.__dict__),
+            remove_nones(public_fields(data)),
             flow_style=flow_style
         )
 
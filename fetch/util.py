@@ -4,13 +4,39 @@ Common functions. (mostly imported from legacy 'neocommon' library.)
 """
 from __future__ import absolute_import
 
+import functools
 import logging
 import os
 import socket
 import subprocess
+import tempfile
 
 _log = logging.getLogger()
 
+# SSH command for rsync.
+RSYNC_SSH_COMMAND = 'ssh -c arcfour'
+
+# SSH options to multiplex rsync's connections (if requested): one master connection per host is kept
+# open briefly and reused by subsequent rsync calls (eg. for each date of a DateRangeSource), avoiding a
+# new SSH handshake for each call.
+# The control socket is in the given directory, named by a hash of the connection (%C).
+RSYNC_SSH_MULTIPLEX_OPTIONS = (
+    ' -o ControlMaster=auto'
+    ' -o ControlPath={control_dir}/fetch-%C'
+    ' -o ControlPersist=60'
+)
+
+
+@functools.lru_cache(maxsize=None)
+def get_fqdn():
+    """
+    The fully qualified name of this host.
+
+    (Looked up once: socket.getfqdn() does a DNS lookup on every call)
+    :rtype: str
+    """
+    return socket.getfqdn()
+
 
 class UnsupportedUriError(Exception):
     """
@@ -212,7 +238,7 @@ class Uri(object):
         if self.scheme == 'file':
             hostname = self.get_hostname()
             if not hostname or hostname in ('localhost',):
-                hostname = socket.getfqdn()
+                hostname = get_fqdn()
                 path = self.to_local_path()
                 return Uri('file', '//%s%s' % (hostname, path))
 
@@ -234,7 +260,7 @@ class Uri(object):
         return not self.__eq__(other)
 
 
-def rsync(source_path, destination_path, source_host=None, destination_host=None):
+def rsync(source_path, destination_path, source_host=None, destination_host=None, multiplex_ssh=False):
     """
     Thing wrapper for rsync command, using default options used in NEO.
 
@@ -244,6 +270,7 @@ def rsync(source_path, destination_path, source_host=None, destination_host=None
 
     :type source_path: str
     :type destination_path: str
+    :param multiplex_ssh: Reuse SSH connections between calls (see RSYNC_SSH_MULTIPLEX_OPTIONS)
     :return: list of files transferred
     :rtype: list of str
     """
@@ -252,15 +279,28 @@ def rsync(source_path, destination_path, source_host=None, destination_host=None
         """Format a (possibly remote) path for rsync"""
         return '%s:%s' % (host, path) if host else path
 
+    ssh_command = RSYNC_SSH_COMMAND
+    if multiplex_ssh:
+        # The user's private directory: anyone able to create the socket could hijack connections.
+        # (Created if needed, as ssh fails when it can't create the socket.)
+        control_dir = os.path.expanduser('~/.ssh')
+        os.makedirs(control_dir, mode=0o700, exist_ok=True)
+        ssh_command += RSYNC_SSH_MULTIPLEX_OPTIONS.format(control_dir=control_dir)
+
     cmd = [
-        'rsync', '-e', 'ssh -c arcfour', '-aL', '--out-format=%n',
+        'rsync', '-e', ssh_command, '-aL', '--out-format=%n',
         format_path(source_host, source_path),
         format_path(destination_host, destination_path)
     ]
     _log.info('Running %r', cmd)
 
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    out, err = proc.communicate()
+    # Stderr goes to a file rather than a pipe: a persisting SSH master connection started by this rsync
+    # inherits it, and reading a pipe to its end would wait for the master to exit too.
+    with tempfile.TemporaryFile() as err_file:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err_file)
+        out, _ = proc.communicate()
+        err_file.seek(0)
+        err = err_file.read()
     transferred = []
     if out:
         _log.info("rsync'd files: %r", out)
@@ -309,3 +349,22 @@ def remove_nones(dict_):
     {}
     """
     return {k: v for k, v in dict_.items() if v is not None}
+
+
+def public_fields(obj):
+    """
+    Get the public properties of an object as a dict.
+
+    Properties starting with an underscore hold derived state (such as caches)
+    rather than configuration, so they are excluded.
+
+    :rtype: dict
+
+    >>> class Example(object):
+    ...     def __init__(self):
+    ...         self.name = 'example'
+    ...         self._cache = {}
+    >>> public_fields(Example())
+    {'name': 'example'}
+    """
+    return {k: v for k, v in obj.__dict__.items() if not k.startswith('_')}
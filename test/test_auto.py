@@ -1,8 +1,14 @@
 from __future__ import absolute_import
 
+import os
+import signal
+import time
 import unittest
 
-from fetch.auto import _filter_finished_children
+from fetch._core import DataSource, EmptySource, ResultHandler
+from fetch.auto import (_filter_finished_children, _attempt_lock, _next_deadline, _run_item,
+                        _terminate_overdue_children, init_run_config, Schedule)
+from fetch.load import ScheduledItem
 
 
 class TestAuto(unittest.TestCase):
@@ -30,3 +36,139 @@ class TestAuto(unittest.TestCase):
             set([running_proc]),
             _filter_finished_children([running_proc, failed_proc, succeeded_proc], [])
         )
+
+    def test_empty_schedule_is_falsy(self):
+        self.assertFalse(Schedule([]))
+        self.assertEqual(1, len(Schedule([ScheduledItem('Empty', '* * * * *', EmptySource())])))
+
+
+def test_lock_is_exclusive(tmpdir):
+    lock_file = str(tmpdir.join('rule.lck'))
+
+    fd = _attempt_lock(lock_file)
+    try:
+        assert fd is not None
+        # Already held, so a second attempt is refused.
+        assert _attempt_lock(lock_file) is None
+
+        with open(lock_file) as f:
+            assert f.read().strip() == str(os.getpid())
+    finally:
+        if fd is not None:
+            os.close(fd)
+
+
+def test_due_items_rescheduled_together():
+    items = [ScheduledItem(name, '* * * * *', EmptySource()) for name in ('a', 'b', 'c')]
+    schedule = Schedule(items)
+    first_trigger = schedule.peek_next()[0]
+
+    due = schedule.pop_due(first_trigger + 1)
+    assert sorted(item.name for _, item in due) == ['a', 'b', 'c']
+    assert not schedule
+
+    schedule.add_items([item for _, item in due], base_date=first_trigger)
+    assert len(schedule) == 3
+    assert schedule.peek_next()[0] == first_trigger + 60
+
+
+def test_reload_keeps_unchanged_items():
+    original = Schedule([
+        ScheduledItem('unchanged', '0 1 * * *', EmptySource()),
+        ScheduledItem('changed', '0 2 * * *', EmptySource()),
+    ])
+    # Pretend time has moved on since the original was scheduled.
+    original.schedule = [(t - 30, id_) for t, id_ in original.schedule]
+    original_entries = dict((item.name, (t, item)) for t, item in original.entries())
+
+    reloaded = Schedule([
+        ScheduledItem('unchanged', '0 1 * * *', EmptySource()),
+        ScheduledItem('changed', '0 3 * * *', EmptySource()),
+        ScheduledItem('added', '0 4 * * *', EmptySource()),
+    ], previous=original)
+    entries = dict((item.name, (t, item)) for t, item in reloaded.entries())
+
+    assert entries['unchanged'] == original_entries['unchanged']
+    assert entries['unchanged'][1] is original_entries['unchanged'][1]
+    assert entries['changed'][1].cron_pattern == '0 3 * * *'
+    assert set(entries) == {'unchanged', 'changed', 'added'}
+
+
+def test_overdue_children_terminated(monkeypatch):
+    killed_groups = []
+    monkeypatch.setattr(os, 'killpg', lambda pgid, sig: killed_groups.append((pgid, sig)))
+
+    class MockProcess:
+        def __init__(self, pid, deadline):
+            self.name = 'p'
+            self.pid = pid
+            self.item = ScheduledItem('Empty', '* * * * *', EmptySource(), timeout=60)
+            self.deadline = deadline
+
+    overdue, running, untimed = MockProcess(1001, 100), MockProcess(1002, 200), MockProcess(1003, None)
+    children = [overdue, running, untimed]
+    assert _next_deadline(children) == 100
+
+    _terminate_overdue_children(children, 150)
+    # Its whole process group is stopped.
+    assert killed_groups == [(1001, signal.SIGTERM)]
+    # Terminated just once.
+    assert _next_deadline(children) == 200
+
+
+def test_due_items_rescheduled_in_place():
+    schedule = Schedule([
+        ScheduledItem('minutely', '* * * * *', EmptySource()),
+        ScheduledItem('yearly', '0 1 1 1 *', EmptySource()),
+    ])
+    first_trigger, first_item = schedule.peek_next()
+    assert first_item.name == 'minutely'
+
+    assert schedule.reschedule_due(first_trigger) == []
+
+    due = schedule.reschedule_due(first_trigger + 1)
+    assert [(t, item.name) for t, item in due] == [(first_trigger, 'minutely')]
+    assert len(schedule) == 2
+    assert schedule.peek_next() == (first_trigger + 60, first_item)
+
+
+class _SleepingSource(DataSource):
+    def trigger(self, reporter):
+        time.sleep(60)
+
+
+def _wait_for_own_process_group(p):
+    for _ in range(200):
+        if os.getpgid(p.pid) == p.pid:
+            return
+        time.sleep(0.01)
+    raise AssertionError('Child never created its process group')
+
+
+def test_exit_signal_passed_to_runs_in_own_process_group(tmpdir):
+    config_path = tmpdir.join('config.yaml')
+    config_path.write('directory: {}\nrules: {{}}\n'.format(tmpdir))
+    handlers = [(s, signal.getsignal(s)) for s in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP)]
+    o = init_run_config(str(config_path))
+    child = None
+    try:
+        item = ScheduledItem('Timed', '* * * * *', _SleepingSource(), timeout=60)
+        child = _run_item(ResultHandler(), item, time.time(), o.log_directory, o.lock_directory)
+        o.running_children.add(child)
+        _wait_for_own_process_group(child)
+
+        # As from Ctrl-C in a terminal: it only reaches our process group, not the child's.
+        os.kill(os.getpid(), signal.SIGINT)
+
+        assert o.are_exiting
+        child.join(10)
+        assert child.exitcode == -signal.SIGINT
+    finally:
+        if child is not None and child.is_alive():
+            child.kill()
+            child.join()
+        for key in list(o.wakeup.get_map().values()):
+            os.close(key.fd)
+        os.close(signal.set_wakeup_fd(-1))
+        for signal_, handler in handlers:
+            signal.signal(signal_, handler)
@@ -0,0 +1,79 @@
+import threading
+
+import pytest
+
+from fetch._core import DataSource, DateRangeSource, RegexpOutputPathTransform, ResultHandler
+
+
+class RecordingSource(DataSource):
+    """A source that records the properties it was triggered with."""
+
+    def __init__(self, url='', triggered=None):
+        super(RecordingSource, self).__init__()
+        self.url = url
+        self.triggered = triggered
+        self.lock = threading.Lock()
+
+    def trigger(self, reporter):
+        with self.lock:
+            self.triggered.append(self.url)
+
+
+def test_each_date_triggered_with_own_properties():
+    prototype = RecordingSource(triggered=[])
+    source = DateRangeSource(
+        prototype,
+        overridden_properties={'url': 'http://example.com/{year}/{julday}'},
+        start_day=-2,
+        end_day=2,
+        parallelism=4
+    )
+    source.trigger(ResultHandler())
+
+    assert len(prototype.triggered) == 5
+    assert len(set(prototype.triggered)) == 5
+    # The prototype itself is left untouched.
+    assert prototype.url == ''
+
+
+def test_failure_is_raised():
+    class FailingSource(DataSource):
+        def trigger(self, reporter):
+            raise IOError('Fetch failed')
+
+    source = DateRangeSource(FailingSource(), overridden_properties={}, start_day=0, end_day=1)
+    with pytest.raises(IOError):
+        source.trigger(ResultHandler())
+
+
+def test_sequential_by_default():
+    threads = []
+
+    class ThreadRecordingSource(DataSource):
+        def trigger(self, reporter):
+            threads.append(threading.current_thread())
+
+    source = DateRangeSource(ThreadRecordingSource(), overridden_properties={}, start_day=-2, end_day=2)
+    source.trigger(ResultHandler())
+
+    assert threads == [threading.current_thread()] * 5
+
+
+def test_dates_do_not_share_filename_transform():
+    transforms = []
+
+    class TransformingSource(DataSource):
+        def __init__(self, filename_transform=None):
+            super(TransformingSource, self).__init__()
+            self.filename_transform = filename_transform
+
+        def trigger(self, reporter):
+            transforms.append(self.filename_transform)
+
+    prototype = TransformingSource(RegexpOutputPathTransform(r'LS8_(?P<year>\d{4})'))
+    source = DateRangeSource(prototype, overridden_properties={}, start_day=-1, end_day=1, parallelism=3)
+    source.trigger(ResultHandler())
+
+    assert len(set(map(id, transforms))) == 3
+    assert all(t is not prototype.filename_transform for t in transforms)
+    assert transforms[0].transform_output_path('/out/{year}', 'LS8_2003') == '/out/2003'
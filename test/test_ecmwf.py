@@ -35,7 +35,7 @@ def test_ecmwf_retrieve_serialisation(ecmwf_config_dir):
     cfg = Config.from_dict(raw_cfg)
 
     with mock.patch.dict(os.environ, {'HOME': ecmwf_config_dir}):
-        with mock.patch('tempfile.mktemp', return_value='/path/to/fetch/dir-fetch'):
+        with mock.patch('fetch._core._create_temp_file', return_value='/path/to/fetch/dir-fetch'):
             for item in cfg.rules:
                 with mock.patch('fetch.ecmwf.ECMWFDataServer') as MockServer:
                     mock_server = MockServer.return_value
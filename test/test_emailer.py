@@ -0,0 +1,52 @@
+import smtplib
+
+import mock
+
+from fetch._core import TaskFailureEmailer
+
+
+@mock.patch('fetch._core.smtplib.SMTP')
+def test_smtp_connection_reused(smtp):
+    emailer = TaskFailureEmailer(['ops@example.com'])
+    emailer.on_file_failure('fetch-0436-ls7-cpf', 'http://example.com/a', 'Status code 500', '')
+    emailer.on_file_failure('fetch-0436-ls7-cpf', 'http://example.com/b', 'Status code 500', '')
+
+    smtp.assert_called_once_with('localhost')
+    assert smtp.return_value.sendmail.call_count == 2
+
+
+@mock.patch('fetch._core.smtplib.SMTP')
+def test_smtp_reconnects_when_closed(smtp):
+    emailer = TaskFailureEmailer(['ops@example.com'])
+    emailer.on_file_failure('fetch-0436-ls7-cpf', 'http://example.com/a', 'Status code 500', '')
+
+    smtp.return_value.noop.side_effect = smtplib.SMTPServerDisconnected()
+    emailer.on_file_failure('fetch-0436-ls7-cpf', 'http://example.com/b', 'Status code 500', '')
+
+    assert smtp.call_count == 2
+
+
+@mock.patch('fetch._core.smtplib.SMTP')
+def test_dead_connection_closed_before_reconnecting(smtp):
+    emailer = TaskFailureEmailer(['ops@example.com'])
+    emailer.on_file_failure('fetch-0436-ls7-cpf', 'http://example.com/a', 'Status code 500', '')
+    dead_connection = smtp.return_value
+
+    smtp.return_value = mock.Mock()
+    dead_connection.noop.side_effect = smtplib.SMTPServerDisconnected()
+    emailer.on_file_failure('fetch-0436-ls7-cpf', 'http://example.com/b', 'Status code 500', '')
+
+    dead_connection.close.assert_called_once_with()
+
+
+@mock.patch('fetch._core.smtplib.SMTP')
+def test_close_quits_connection(smtp):
+    emailer = TaskFailureEmailer(['ops@example.com'])
+    emailer.close()
+    smtp.assert_not_called()
+
+    emailer.on_file_failure('fetch-0436-ls7-cpf', 'http://example.com/a', 'Status code 500', '')
+    emailer.close()
+
+    smtp.return_value.quit.assert_called_once_with()
+    smtp.return_value.close.assert_called_once_with()
@@ -0,0 +1,251 @@
+import logging
+import os
+from email.utils import formatdate
+
+import mock
+import pytest
+
+from fetch import _core, http
+from fetch._core import RegexpOutputPathTransform, ResultHandler
+
+
+def _head_response(size, mtime):
+    res = mock.Mock(ok=True)
+    res.headers = {
+        'Content-Length': str(size),
+        'Last-Modified': formatdate(mtime, usegmt=True),
+    }
+    return res
+
+
+def _existing_file(tmpdir, content=b'tle data'):
+    target = tmpdir.join('norad.tle')
+    target.write_binary(content)
+    os.utime(str(target), (1500000000, 1500000000))
+    return target
+
+
+def test_unchanged_file_is_skipped(tmpdir):
+    _existing_file(tmpdir)
+    session = mock.Mock()
+    session.head.return_value = _head_response(len(b'tle data'), 1400000000)
+
+    source = http.HttpSource(str(tmpdir), url='http://example.com/norad.tle', skip_unchanged=True)
+    source.trigger_url(ResultHandler(), session, 'http://example.com/norad.tle')
+
+    session.head.assert_called_once()
+    session.get.assert_not_called()
+
+
+def test_modified_file_is_fetched(tmpdir):
+    target = _existing_file(tmpdir)
+    session = mock.Mock()
+    session.head.return_value = _head_response(len(b'tle data'), 1600000000)
+    session.get.return_value.ok = True
+    session.get.return_value.headers = {}
+    session.get.return_value.iter_content.return_value = [b'new tle data']
+
+    source = http.HttpSource(str(tmpdir), url='http://example.com/norad.tle', skip_unchanged=True)
+    source.trigger_url(ResultHandler(), session, 'http://example.com/norad.tle')
+
+    assert target.read_binary() == b'new tle data'
+
+
+def _supports_xattrs(tmpdir):
+    probe = tmpdir.join('probe')
+    probe.write('')
+    try:
+        os.setxattr(str(probe), http.ETAG_XATTR, b'1')
+        return True
+    except (AttributeError, OSError):
+        return False
+    finally:
+        probe.remove()
+
+
+def test_etag_decides_when_recorded(tmpdir):
+    if not _supports_xattrs(tmpdir):
+        pytest.skip('No extended attribute support')
+
+    session = mock.Mock()
+    session.get.return_value.ok = True
+    session.get.return_value.headers = {'ETag': '"v1"'}
+    session.get.return_value.iter_content.return_value = [b'tle data']
+    source = http.HttpSource(str(tmpdir), url='http://example.com/norad.tle', skip_unchanged=True)
+    source.trigger_url(ResultHandler(), session, 'http://example.com/norad.tle')
+
+    # Same ETag: skipped, even though the server's time is newer.
+    session.head.return_value = _head_response(len(b'tle data'), 2000000000)
+    session.head.return_value.headers['ETag'] = '"v1"'
+    source.trigger_url(ResultHandler(), session, 'http://example.com/norad.tle')
+    assert session.get.call_count == 1
+
+    # A new ETag: fetched, though the size and time suggest it's unchanged.
+    session.head.return_value = _head_response(len(b'tle data'), 1000000000)
+    session.head.return_value.headers['ETag'] = '"v2"'
+    source.trigger_url(ResultHandler(), session, 'http://example.com/norad.tle')
+    assert session.get.call_count == 2
+
+
+def test_missing_file_is_fetched_without_head(tmpdir):
+    session = mock.Mock()
+    session.get.return_value.ok = True
+    session.get.return_value.headers = {}
+    session.get.return_value.iter_content.return_value = [b'tle data']
+
+    source = http.HttpSource(str(tmpdir), url='http://example.com/norad.tle', skip_unchanged=True)
+    source.trigger_url(ResultHandler(), session, 'http://example.com/norad.tle')
+
+    session.head.assert_not_called()
+    assert tmpdir.join('norad.tle').read_binary() == b'tle data'
+
+
+def _listing_source(tmpdir):
+    return http.HttpListingSource(str(tmpdir), url='http://example.com/', resume_partial=True, retry_count=0,
+                                  retry_delay_seconds=0)
+
+
+def test_failed_download_is_resumed(tmpdir):
+    session = mock.Mock()
+    session.get.return_value.ok = False
+    session.get.return_value.text = 'error'
+    source = _listing_source(tmpdir)
+
+    def partial_write(url, **kwargs):
+        tmpdir.join('.fetch-norad.tle.part').write_binary(b'tle ')
+        return session.get.return_value
+
+    session.get.side_effect = partial_write
+    source._fetch_files([('http://example.com/norad.tle', 'norad.tle')], ResultHandler(), session=session,
+                        resumable=True)
+    assert tmpdir.join('.fetch-norad.tle.part').read_binary() == b'tle '
+
+    session.get.side_effect = None
+    session.get.return_value = mock.Mock(ok=True, status_code=206)
+    session.get.return_value.iter_content.return_value = [b'data']
+    source._fetch_files([('http://example.com/norad.tle', 'norad.tle')], ResultHandler(), session=session,
+                        resumable=True)
+
+    assert session.get.call_args[1]['headers'] == {'Range': 'bytes=4-'}
+    assert tmpdir.join('norad.tle').read_binary() == b'tle data'
+    assert not tmpdir.join('.fetch-norad.tle.part').exists()
+
+
+def test_partial_ignored_if_range_unsupported(tmpdir):
+    tmpdir.join('.fetch-norad.tle.part').write_binary(b'stale')
+    session = mock.Mock()
+    # A full response, rather than the requested range.
+    session.get.return_value = mock.Mock(ok=True, status_code=200)
+    session.get.return_value.iter_content.return_value = [b'tle data']
+
+    source = _listing_source(tmpdir)
+    source._fetch_files([('http://example.com/norad.tle', 'norad.tle')], ResultHandler(), session=session,
+                        resumable=True)
+
+    assert tmpdir.join('norad.tle').read_binary() == b'tle data'
+
+
+def test_large_file_fetched_in_ranges(tmpdir):
+    content = bytes(range(256)) * (http.MIN_RANGED_DOWNLOAD_SIZE // 256 + 3)
+    session = mock.Mock()
+    session.head.return_value = mock.Mock(ok=True)
+    session.head.return_value.headers = {'Accept-Ranges': 'bytes', 'Content-Length': str(len(content))}
+
+    def ranged_get(url, headers=None, **kwargs):
+        start, end = map(int, headers['Range'][len('bytes='):].split('-'))
+        res = mock.Mock(status_code=206)
+        res.iter_content.return_value = [content[start:end + 1]]
+        return res
+
+    session.get.side_effect = ranged_get
+
+    source = http.HttpSource(str(tmpdir), url='http://example.com/big.nc', connections=3)
+    source.trigger_url(ResultHandler(), session, 'http://example.com/big.nc')
+
+    assert session.get.call_count == 3
+    assert tmpdir.join('big.nc').read_binary() == content
+
+
+def test_fetched_file_has_default_permissions(tmpdir):
+    session = mock.Mock()
+    session.get.return_value.ok = True
+    session.get.return_value.headers = {}
+    session.get.return_value.iter_content.return_value = [b'tle data']
+
+    source = http.HttpSource(str(tmpdir), url='http://example.com/norad.tle')
+    old_umask = os.umask(0o022)
+    try:
+        source.trigger_url(ResultHandler(), session, 'http://example.com/norad.tle')
+    finally:
+        os.umask(old_umask)
+
+    assert os.stat(str(tmpdir.join('norad.tle'))).st_mode & 0o777 == 0o644
+
+
+def _ranged_head(content, etag=None):
+    res = mock.Mock(ok=True)
+    res.headers = {'Accept-Ranges': 'bytes', 'Content-Length': str(len(content))}
+    if etag:
+        res.headers['ETag'] = etag
+    return res
+
+
+def test_fetched_whole_if_ranges_ignored(tmpdir):
+    content = b'x' * (http.MIN_RANGED_DOWNLOAD_SIZE + 1)
+    session = mock.Mock()
+    session.head.return_value = _ranged_head(content)
+    # Ranges were advertised, but the whole file is returned.
+    session.get.return_value = mock.Mock(ok=True, status_code=200, headers={})
+    session.get.return_value.iter_content.return_value = [content]
+    text = mock.PropertyMock()
+    type(session.get.return_value).text = text
+
+    source = http.HttpSource(str(tmpdir), url='http://example.com/big.nc', connections=3, retry_count=0)
+    source.trigger_url(ResultHandler(), session, 'http://example.com/big.nc')
+
+    # The responses to the range requests aren't read.
+    text.assert_not_called()
+    assert session.get.call_args[1]['headers'] is None
+    assert tmpdir.join('big.nc').read_binary() == content
+
+
+def test_etag_recorded_for_ranged_fetch(tmpdir):
+    if not _supports_xattrs(tmpdir):
+        pytest.skip('No extended attribute support')
+
+    content = b'x' * (http.MIN_RANGED_DOWNLOAD_SIZE + 1)
+    session = mock.Mock()
+    session.head.return_value = _ranged_head(content, etag='"v1"')
+
+    def ranged_get(url, headers=None, **kwargs):
+        start, end = map(int, headers['Range'][len('bytes='):].split('-'))
+        res = mock.Mock(status_code=206)
+        res.iter_content.return_value = [content[start:end + 1]]
+        return res
+
+    session.get.side_effect = ranged_get
+
+    source = http.HttpSource(str(tmpdir), url='http://example.com/big.nc', skip_unchanged=True, connections=2)
+    source.trigger_url(ResultHandler(), session, 'http://example.com/big.nc')
+
+    assert http._recorded_etag(str(tmpdir.join('big.nc'))) == '"v1"'
+
+
+def test_existing_files_skipped_before_preparing_dirs(tmpdir, caplog):
+    caplog.set_level(logging.INFO)
+    tmpdir.join('2001').mkdir().join('2001_a.txt').write('a')
+    session = mock.Mock()
+    session.get.return_value = mock.Mock(ok=True, status_code=200, headers={})
+    session.get.return_value.iter_content.return_value = [b'data']
+
+    source = http.HttpListingSource(str(tmpdir.join('{year}')), url='http://example.com/', retry_count=0,
+                                    filename_transform=RegexpOutputPathTransform(r'(?P<year>\d{4})_.*'))
+    with mock.patch('fetch._core._ensure_dir', wraps=_core._ensure_dir) as ensure_dir:
+        source._fetch_files([('http://example.com/2001_a.txt', '2001_a.txt'),
+                             ('http://example.com/other.txt', 'other.txt')], ResultHandler(), session=session)
+
+    # Only the file that's fetched.
+    assert [c[0][0] for c in session.get.call_args_list] == ['http://example.com/other.txt']
+    assert str(tmpdir.join('2001')) not in [c[0][0] for c in ensure_dir.call_args_list]
+    # Its (missing) match is only reported once.
+    assert len([r for r in caplog.records if r.getMessage().startswith('No regexp match')]) == 1
@@ -7,6 +7,7 @@ import pytest
 from pathlib import Path
 
 from fetch import load
+from fetch._core import EmptySource
 
 with_neocommon = pytest.mark.with_neocommon
 
@@ -58,6 +59,16 @@ def test_dump_load_obj_with_messaging():
     _check_load_dump_config(make_config_no_messaging)
 
 
+@pytest.mark.parametrize('timeout', ['soon', 0, -5, True, [60]])
+def test_invalid_timeout_rejected_on_load(timeout):
+    with pytest.raises(ValueError):
+        load.ScheduledItem('Item', '* * * * *', EmptySource(), timeout=timeout)
+
+
+def test_timeout_read_as_seconds():
+    assert load.ScheduledItem('Item', '* * * * *', EmptySource(), timeout='90').timeout == 90.0
+
+
 def print_simple_obj_diff(dict1, dict2):
     if type(dict2) in (int, float, str, text):
         print('-   {!r}'.format(dict1))
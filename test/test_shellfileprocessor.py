@@ -2,7 +2,9 @@
 import os
 from pathlib import Path
 
-from fetch._core import ShellFileProcessor
+import pytest
+
+from fetch._core import FileProcessError, ShellFileProcessor
 
 
 def test_shellfilepro_required_files_there():
@@ -28,4 +30,33 @@ def test_shellfilepro_required_files_not_there():
     # Future option is to ask for a tmp_path, and make your command touch {tmp_path / 'test_file.txt'}.
     # Then if the file exists, you know the command was run. It could work in both tests.
 
+
+def test_shellfilepro_path_with_spaces(tmp_path):
+    source = tmp_path / 'some file.txt'
+    source.write_text('data')
+    sfp = ShellFileProcessor(command='cp {parent_dir}/{filename} {parent_dir}/{file_stem}.copy',
+                             expect_file='{parent_dir}/{file_stem}.copy')
+
+    assert sfp.process(str(source)) == str(tmp_path / 'some file.copy')
+
+
+def test_shellfilepro_shell_syntax(tmp_path):
+    source = tmp_path / 'input.txt'
+    source.write_text('data')
+    sfp = ShellFileProcessor(command='cat {parent_dir}/{filename} > {parent_dir}/{file_stem}.out',
+                             expect_file='{parent_dir}/{file_stem}.out')
+
+    assert sfp.process(str(source)) == str(tmp_path / 'input.out')
+    assert (tmp_path / 'input.out').read_text() == 'data'
+
+
+def test_shellfilepro_unbalanced_quotes(tmp_path):
+    source = tmp_path / 'input.txt'
+    source.write_text('data')
+    sfp = ShellFileProcessor(command='echo "unbalanced {filename}', expect_file='{parent_dir}/{file_stem}.out')
+
+    # Reported like any other failed command.
+    with pytest.raises(FileProcessError):
+        sfp.process(str(source))
+
 # Add a test when no required_files parameter is supplied at all